@@ -15,6 +15,10 @@ import platform
 from urllib.parse import urlparse
 from typing import List, Optional, Dict
 
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.domain_matcher import DomainMatcher
 
 # 下载代理域名列表
 DOWNLOAD_PROXY_DOMAINS = [
@@ -23,6 +27,8 @@ DOWNLOAD_PROXY_DOMAINS = [
     'proxy-vd.58pic.com',
 ]
 
+DOWNLOAD_PROXY_MATCHER = DomainMatcher(DOWNLOAD_PROXY_DOMAINS)
+
 
 def extract_domain_from_url(url: str) -> Optional[str]:
     """从URL中提取域名"""
@@ -59,12 +65,10 @@ def check_download_url(url: str) -> Dict[str, any]:
     result['domain'] = domain
     
     # 检查是否是下载代理域名
-    for proxy_domain in DOWNLOAD_PROXY_DOMAINS:
-        if domain == proxy_domain or domain.endswith('.' + proxy_domain):
-            result['is_proxy_domain'] = True
-            result['needs_hosts_bind'] = True
-            result['suggestions'].append(f'需要绑定hosts: {domain}')
-            break
+    if domain in DOWNLOAD_PROXY_MATCHER:
+        result['is_proxy_domain'] = True
+        result['needs_hosts_bind'] = True
+        result['suggestions'].append(f'需要绑定hosts: {domain}')
     
     return result
 
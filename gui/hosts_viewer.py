@@ -18,16 +18,24 @@ from PyQt6.QtGui import QFont
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from hosts.check_hosts import get_hosts_path, check_hosts
+from hosts.hosts_file import HostsFile
 from hosts.unbind_hosts import unbind_domain, unbind_all_qiantu
 
 
 class HostsViewer(QDialog):
     """Hosts配置查看窗口"""
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, watcher=None):
         super().__init__(parent)
+        self.watcher = watcher
+        self.bindings = {}  # 表格当前显示的绑定 {域名: 绑定信息}
         self.init_ui()
         self.refresh_data()
+        
+        # hosts文件变化时只更新变化的行（由监听线程推送增量，无需重新解析）
+        if self.watcher:
+            self.watcher.bindings_diff.connect(self.on_bindings_diff)
+            self.finished.connect(self._disconnect_watcher)
     
     def init_ui(self):
         """初始化UI"""
@@ -121,65 +129,120 @@ class HostsViewer(QDialog):
         layout.addLayout(button_layout)
         self.setLayout(layout)
     
-    def refresh_data(self):
-        """刷新数据"""
+    def _disconnect_watcher(self):
+        """对话框关闭后不再接收推送"""
         try:
-            bindings = check_hosts()
-            hosts_path = get_hosts_path()
-            
-            # 更新表格
-            self.table.setRowCount(len(bindings))
-            
-            row = 0
-            for domain, info in sorted(bindings.items()):
-                # 域名
-                domain_item = QTableWidgetItem(domain)
-                self.table.setItem(row, 0, domain_item)
-                
-                # IP地址
-                ip = info.get('ip', '未绑定')
-                ip_item = QTableWidgetItem(ip)
-                if ip == '未绑定':
-                    ip_item.setForeground(Qt.GlobalColor.gray)
-                self.table.setItem(row, 1, ip_item)
-                
-                # 行号
-                line_item = QTableWidgetItem(str(info.get('line', 'N/A')))
-                self.table.setItem(row, 2, line_item)
-                
-                # 操作按钮
-                if ip != '未绑定':
-                    unbind_btn = QPushButton("解绑")
-                    unbind_btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: #ff4d4f;
-                            color: white;
-                            border: none;
-                            border-radius: 4px;
-                            padding: 4px 10px;
-                        }
-                        QPushButton:hover {
-                            background-color: #ff7875;
-                        }
-                    """)
-                    unbind_btn.clicked.connect(lambda checked, d=domain: self.unbind_domain(d))
-                    self.table.setCellWidget(row, 3, unbind_btn)
-                else:
-                    self.table.setItem(row, 3, QTableWidgetItem("-"))
-                
-                row += 1
+            self.watcher.bindings_diff.disconnect(self.on_bindings_diff)
+        except (TypeError, RuntimeError):
+            pass
+    
+    def on_bindings_diff(self, diff: dict):
+        """接收hosts监听推送的绑定变化，只增删改变化的行"""
+        try:
+            for domain in diff.get('removed', {}):
+                row = self._find_row(domain)
+                if row is not None:
+                    self.table.removeRow(row)
+                self.bindings.pop(domain, None)
             
-            # 更新统计信息
-            bound_count = sum(1 for info in bindings.values() if info.get('ip') and info.get('ip') != '未绑定')
-            total_count = len(bindings)
-            self.stats_label.setText(
-                f"统计: 已绑定 {bound_count} 个域名，未绑定 {total_count - bound_count} 个域名 | "
-                f"Hosts文件: {hosts_path}"
-            )
+            # 打开窗口后读取的内容可能已包含部分变化，已有的行直接更新
+            updates = {**diff.get('added', {}), **diff.get('changed', {})}
+            for domain, info in sorted(updates.items()):
+                row = self._find_row(domain)
+                if row is None:
+                    row = self._insert_position(domain)
+                    self.table.insertRow(row)
+                self._fill_row(row, domain, info)
+                self.bindings[domain] = info
             
+            self._update_stats()
+        except Exception as e:
+            print(f"更新hosts表格失败: {e}")
+    
+    def _find_row(self, domain: str):
+        """域名所在的行，不存在时返回None"""
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 0)
+            if item is not None and item.text() == domain:
+                return row
+        return None
+    
+    def _insert_position(self, domain: str) -> int:
+        """新域名按字母顺序插入的行"""
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 0)
+            if item is not None and item.text() > domain:
+                return row
+        return self.table.rowCount()
+    
+    def refresh_data(self):
+        """刷新数据"""
+        try:
+            # 通过HostsFile模型读取（带解析缓存，文件未变化时不重新解析），
+            # 行号与解绑时修改的是同一份模型
+            self.show_bindings(check_hosts(hosts=HostsFile.load()))
         except Exception as e:
             QMessageBox.warning(self, "错误", f"刷新数据失败: {str(e)}")
     
+    def show_bindings(self, bindings: dict):
+        """用绑定数据填充表格"""
+        self.bindings = dict(bindings)
+        
+        # 更新表格
+        self.table.setRowCount(len(bindings))
+        for row, (domain, info) in enumerate(sorted(bindings.items())):
+            self._fill_row(row, domain, info)
+        
+        self._update_stats()
+    
+    def _fill_row(self, row: int, domain: str, info: dict):
+        """填充一行"""
+        # 域名
+        domain_item = QTableWidgetItem(domain)
+        self.table.setItem(row, 0, domain_item)
+        
+        # IP地址
+        ip = info.get('ip', '未绑定')
+        ip_item = QTableWidgetItem(ip)
+        if ip == '未绑定':
+            ip_item.setForeground(Qt.GlobalColor.gray)
+        self.table.setItem(row, 1, ip_item)
+        
+        # 行号
+        line_item = QTableWidgetItem(str(info.get('line', 'N/A')))
+        self.table.setItem(row, 2, line_item)
+        
+        # 操作按钮
+        if ip != '未绑定':
+            unbind_btn = QPushButton("解绑")
+            unbind_btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #ff4d4f;
+                    color: white;
+                    border: none;
+                    border-radius: 4px;
+                    padding: 4px 10px;
+                }
+                QPushButton:hover {
+                    background-color: #ff7875;
+                }
+            """)
+            unbind_btn.clicked.connect(lambda checked, d=domain: self.unbind_domain(d))
+            self.table.setCellWidget(row, 3, unbind_btn)
+        else:
+            self.table.removeCellWidget(row, 3)
+            self.table.setItem(row, 3, QTableWidgetItem("-"))
+    
+    def _update_stats(self):
+        """更新统计信息"""
+        bindings = self.bindings
+        bound_count = sum(1 for info in bindings.values() if info.get('ip') and info.get('ip') != '未绑定')
+        total_count = len(bindings)
+        self.stats_label.setText(
+            f"统计: 已绑定 {bound_count} 个域名，未绑定 {total_count - bound_count} 个域名 | "
+            f"Hosts文件: {get_hosts_path()}"
+        )
+    
     def unbind_domain(self, domain: str):
         """解绑域名"""
         reply = QMessageBox.question(
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hosts文件监听线程
+hosts文件被修改时（包括SwitchHosts!等其他工具的修改）推送千图绑定的增量变化和最新的完整绑定
+"""
+
+import os
+import sys
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# 添加路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.check_hosts import get_hosts_path, check_hosts
+from hosts.watch_hosts import create_watcher, diff_bindings
+
+
+class HostsWatcher(QThread):
+    """后台线程：监听hosts文件，绑定变化时发送增量变化和完整绑定"""
+    bindings_diff = pyqtSignal(dict)  # {'added': {...}, 'removed': {...}, 'changed': {...}}
+    bindings_changed = pyqtSignal(dict)  # check_hosts的结果 {域名: 绑定信息}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._stop_requested = False
+        self.bindings = None
+
+    def stop(self):
+        """请求停止线程"""
+        self._stop_requested = True
+
+    def run(self):
+        """在后台线程中执行"""
+        try:
+            watcher = create_watcher(get_hosts_path())
+        except Exception as e:
+            print(f"hosts监听启动失败: {e}")  # 不阻塞，只打印日志
+            return
+
+        try:
+            self._publish()
+            while not self._stop_requested:
+                # 短超时等待，保证能及时响应停止请求
+                if watcher.wait(0.5) and not self._stop_requested:
+                    self._publish()
+        finally:
+            watcher.close()
+
+    def _publish(self):
+        """重新检查绑定，有变化时发送信号（check_hosts自带解析缓存）"""
+        try:
+            bindings = check_hosts()
+        except Exception as e:
+            print(f"hosts检查失败: {e}")
+            return
+
+        if bindings == self.bindings:
+            return
+
+        diff = diff_bindings(self.bindings or {}, bindings)
+        self.bindings = bindings
+        self.bindings_diff.emit(diff)
+        self.bindings_changed.emit(bindings)
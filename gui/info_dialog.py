@@ -7,6 +7,7 @@
 
 import os
 import sys
+from datetime import datetime
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, QWidget,
     QLabel, QPushButton, QTableWidget, QTableWidgetItem,
@@ -18,52 +19,57 @@ from PyQt6.QtGui import QFont, QClipboard, QGuiApplication
 # 添加路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.system_info import SystemInfoCollector
+from utils.system_info import SystemInfoCollector, SECTIONS
+
+# 部分键 -> 名称
+SECTION_LABELS = {key: label for key, label, _ in SECTIONS}
 
 
 class InfoCollectorWorker(QThread):
-    """信息收集工作线程"""
+    """信息收集工作线程（每完成一部分、每Ping完一个域名立即发送结果）"""
     progress_updated = pyqtSignal(int, str)  # 进度, 消息
+    section_ready = pyqtSignal(str, dict)  # 部分键, 该部分的数据
+    ping_result = pyqtSignal(str, dict)  # 域名, Ping结果
     finished = pyqtSignal(dict)  # 收集的数据
     
-    def __init__(self):
+    def __init__(self, force_refresh: bool = False):
         super().__init__()
         self.collector = SystemInfoCollector()
+        self.force_refresh = force_refresh  # 忽略缓存，全部重新收集
     
     def run(self):
-        """执行收集"""
+        """执行收集（各部分并发收集，每完成一部分更新一次进度）"""
         try:
-            self.progress_updated.emit(10, "正在收集系统信息...")
-            system_info = self.collector.get_system_info()
-            
-            self.progress_updated.emit(25, "正在收集浏览器信息...")
-            browser_info = self.collector.get_browser_info()
-            
-            self.progress_updated.emit(40, "正在收集网络信息...")
-            network_info = self.collector.get_network_info()
-            
-            self.progress_updated.emit(55, "正在收集DNS信息...")
-            dns_info = self.collector.get_dns_info()
-            
-            self.progress_updated.emit(70, "正在收集Hosts信息...")
-            hosts_info = self.collector.get_hosts_info()
+            self.progress_updated.emit(5, "正在收集系统信息...")
+            total = len(SECTIONS)
+            completed = []
+            pinged = []
             
-            self.progress_updated.emit(85, "正在执行Ping测试...")
-            ping_info = self.collector.ping_domains()
+            def on_ping(domain: str, result: dict):
+                # 在Ping的收集线程中调用，逐个域名报告结果
+                pinged.append(domain)
+                self.ping_result.emit(domain, result)
+                status = (result.get('latency') or "✓") if result.get('success') else "✗"
+                self.progress_updated.emit(5 + 90 * len(completed) // total,
+                                           f"Ping {domain}: {status}（已完成{len(pinged)}个域名）")
             
-            self.progress_updated.emit(95, "正在检查权限...")
-            perm_info = self.collector.check_permissions()
-            
-            data = {
-                'system': system_info,
-                'browser': browser_info,
-                'network': network_info,
-                'dns': dns_info,
-                'hosts': hosts_info,
-                'ping': ping_info,
-                'permissions': perm_info,
-            }
+            data = {'timestamp': datetime.now().isoformat()}
+            for key, result in self.collector.iter_sections(on_ping=on_ping,
+                                                            force_refresh=self.force_refresh):
+                data[key] = result
+                completed.append(key)
+                self.section_ready.emit(key, result)
+                label = SECTION_LABELS.get(key, key)
+                if result.get('timeout'):
+                    status = "超时"
+                elif key in self.collector.cached_sections:
+                    status = "完成（缓存）"
+                else:
+                    status = "完成"
+                self.progress_updated.emit(5 + 90 * len(completed) // total,
+                                           f"{label}{status}（{len(completed)}/{total}）")
             
+            data['cached'] = self.collector.cached_info()
             self.progress_updated.emit(100, "收集完成！")
             self.finished.emit(data)
             
@@ -148,7 +154,8 @@ class InfoDialog(QDialog):
         button_layout.setSpacing(10)
         
         refresh_btn = QPushButton("🔄 刷新")
-        refresh_btn.clicked.connect(self.start_collect)
+        refresh_btn.setToolTip("忽略缓存，重新收集所有信息")
+        refresh_btn.clicked.connect(lambda: self.start_collect(force_refresh=True))
         refresh_btn.setStyleSheet("""
             QPushButton {
                 background-color: #1890ff;
@@ -213,15 +220,30 @@ class InfoDialog(QDialog):
             table.setItem(row, 1, value_item)
             row += 1
     
-    def start_collect(self):
-        """开始收集信息"""
+    def start_collect(self, force_refresh: bool = False):
+        """开始收集信息（force_refresh为True时不使用缓存）"""
+        if self.worker and self.worker.isRunning():
+            return  # 上一次收集尚未完成，避免两次结果交替写入标签页
+        
         self.progress_bar.setVisible(True)
         self.status_label.setVisible(True)
         self.progress_bar.setValue(0)
         self.status_label.setText("正在收集信息...")
         
-        self.worker = InfoCollectorWorker()
+        # 各标签页先显示占位，数据到达后逐个填充
+        self.data = {}
+        self.ping_rows = {}
+        for tab in self.section_tabs().values():
+            table = tab.findChild(QTableWidget)
+            if table:
+                table.setRowCount(1)
+                table.setItem(0, 0, QTableWidgetItem("状态"))
+                table.setItem(0, 1, QTableWidgetItem("正在收集..."))
+        
+        self.worker = InfoCollectorWorker(force_refresh=force_refresh)
         self.worker.progress_updated.connect(self.on_progress_updated)
+        self.worker.section_ready.connect(self.on_section_ready)
+        self.worker.ping_result.connect(self.on_ping_result)
         self.worker.finished.connect(self.on_collect_finished)
         self.worker.start()
     
@@ -230,6 +252,47 @@ class InfoDialog(QDialog):
         self.progress_bar.setValue(value)
         self.status_label.setText(message)
     
+    def section_tabs(self) -> dict:
+        """部分键 -> 标签页"""
+        return {
+            'system': self.system_tab,
+            'browser': self.browser_tab,
+            'network': self.network_tab,
+            'dns': self.dns_tab,
+            'hosts': self.hosts_tab,
+            'ping': self.ping_tab,
+            'permissions': self.perm_tab,
+        }
+    
+    def on_section_ready(self, key: str, data: dict):
+        """某一部分收集完成：立即更新对应的标签页"""
+        self.data[key] = data
+        updaters = {
+            'system': self.update_system_tab,
+            'browser': self.update_browser_tab,
+            'network': self.update_network_tab,
+            'dns': self.update_dns_tab,
+            'hosts': self.update_hosts_tab,
+            'ping': self.update_ping_tab,
+            'permissions': self.update_perm_tab,
+        }
+        if key in updaters:
+            updaters[key](data)
+    
+    def on_ping_result(self, domain: str, result: dict):
+        """一个域名Ping完成：在Ping标签页中添加（或更新）该域名的行"""
+        table = self.ping_tab.findChild(QTableWidget)
+        if not table or 'ping' in self.data:  # Ping部分已结束（如超时）后晚到的结果忽略
+            return
+        if not self.ping_rows:
+            table.setRowCount(0)  # 清除占位行
+        row = self.ping_rows.get(domain)
+        if row is None:
+            row = self.ping_rows[domain] = table.rowCount()
+            table.setRowCount(row + 1)
+        table.setItem(row, 0, QTableWidgetItem(domain))
+        table.setItem(row, 1, QTableWidgetItem(self.format_ping_result(result)))
+    
     def on_collect_finished(self, data: dict):
         """收集完成"""
         self.progress_bar.setVisible(False)
@@ -239,16 +302,8 @@ class InfoDialog(QDialog):
             QMessageBox.warning(self, "错误", f"收集信息时出错: {data['error']}")
             return
         
+        # 各标签页已在收集过程中逐个更新
         self.data = data
-        
-        # 更新各个标签页
-        self.update_system_tab(data.get('system', {}))
-        self.update_browser_tab(data.get('browser', {}))
-        self.update_network_tab(data.get('network', {}))
-        self.update_dns_tab(data.get('dns', {}))
-        self.update_hosts_tab(data.get('hosts', {}))
-        self.update_ping_tab(data.get('ping', {}))
-        self.update_perm_tab(data.get('permissions', {}))
     
     def update_system_tab(self, data: dict):
         """更新系统信息标签页"""
@@ -270,8 +325,10 @@ class InfoDialog(QDialog):
         """更新浏览器信息标签页"""
         table = self.browser_tab.findChild(QTableWidget)
         if table:
-            items = []
+            items = [('✗ 获取失败', data['error'])] if 'error' in data else []
             for browser_name, info in data.items():
+                if not isinstance(info, dict):
+                    continue
                 if info.get('installed'):
                     items.append((browser_name, f"版本: {info.get('version', 'N/A')}, 兼容: {'✓' if info.get('compatible') else '✗'}"))
                 else:
@@ -339,18 +396,23 @@ class InfoDialog(QDialog):
         """更新Ping测试标签页"""
         table = self.ping_tab.findChild(QTableWidget)
         if table:
-            items = []
+            items = [('✗ 获取失败', data['error'])] if 'error' in data else []
             for domain, result in data.items():
-                if result.get('success'):
-                    items.append((domain, f"IP: {result.get('ip', 'N/A')}, 延迟: {result.get('latency', 'N/A')}, 丢包: {result.get('loss', 'N/A')}"))
-                else:
-                    items.append((domain, f"✗ 失败: {result.get('error', 'N/A')}"))
+                if not isinstance(result, dict):
+                    continue
+                items.append((domain, self.format_ping_result(result)))
             
             table.setRowCount(len(items))
             for row, (key, value) in enumerate(items):
                 table.setItem(row, 0, QTableWidgetItem(key))
                 table.setItem(row, 1, QTableWidgetItem(str(value)))
     
+    def format_ping_result(self, result: dict) -> str:
+        """单个域名Ping结果的显示文本"""
+        if result.get('success'):
+            return f"IP: {result.get('ip', 'N/A')}, 延迟: {result.get('latency', 'N/A')}, 丢包: {result.get('loss', 'N/A')}, 方式: {(result.get('method') or 'N/A').upper()}"
+        return f"✗ 失败: {result.get('error', 'N/A')}"
+    
     def update_perm_tab(self, data: dict):
         """更新权限信息标签页"""
         table = self.perm_tab.findChild(QTableWidget)
@@ -72,7 +72,7 @@ def handle_tool_request(tool_type: str, main_window: MainWindow):
     """处理工具请求"""
     try:
         if tool_type == 'check_hosts':
-            dialog = HostsViewer(main_window)
+            dialog = HostsViewer(main_window, watcher=main_window.hosts_watcher)
             dialog.exec()
         
         elif tool_type == 'clear_cache':
@@ -20,6 +20,8 @@ from PyQt6.QtGui import QFont, QIcon
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from gui.widgets.problem_card import ProblemCard
+from gui.hosts_watcher import HostsWatcher
+from gui.pre_resolver import PreResolveWorker
 
 # 问题定义（从diagnose.py复用）
 PROBLEMS = {
@@ -73,6 +75,8 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.hosts_worker = None  # 保存线程引用，用于清理
+        self.hosts_watcher = None  # hosts文件监听线程
+        self.pre_resolver = None  # IP预解析线程
         
         # 设置基本窗口属性
         self.setWindowTitle("千图网问题解决工具 V0.0.1")
@@ -84,7 +88,8 @@ class MainWindow(QMainWindow):
         # 延迟更新状态栏，让窗口先显示，提升启动速度
         # 分阶段更新：先显示窗口，再异步更新状态
         QTimer.singleShot(200, self.update_status_quick)  # 快速更新（延迟200ms，不阻塞）
-        QTimer.singleShot(1500, self.update_status_async)  # 异步更新（后台线程，延迟更久）
+        QTimer.singleShot(1500, self.start_hosts_watcher)  # 监听hosts文件（后台线程，延迟更久）
+        QTimer.singleShot(3000, self.start_pre_resolve)  # 预解析问题域名的IP（低优先级后台线程）
     
     def init_ui(self):
         """初始化UI"""
@@ -178,6 +183,7 @@ class MainWindow(QMainWindow):
         self.status_system = QLabel()
         self.status_permission = QLabel()
         self.status_hosts = QLabel()
+        self.status_resolve = QLabel()
         self.status_version = QLabel("版本: V0.0.1")
         self.status_version.setStyleSheet("color: #999; font-size: 11px;")
         
@@ -187,6 +193,8 @@ class MainWindow(QMainWindow):
         status_layout.addStretch()
         status_layout.addWidget(self.status_hosts)
         status_layout.addStretch()
+        status_layout.addWidget(self.status_resolve)
+        status_layout.addStretch()
         status_layout.addWidget(self.status_version)
         
         status_widget.setLayout(status_layout)
@@ -268,6 +276,40 @@ class MainWindow(QMainWindow):
         self.hosts_worker.finished.connect(self.on_hosts_worker_finished)  # 线程完成时清理
         self.hosts_worker.start()
     
+    def start_hosts_watcher(self):
+        """启动hosts文件监听，文件变化时实时更新状态栏"""
+        if self.hosts_watcher:
+            return
+        self.hosts_watcher = HostsWatcher()
+        self.hosts_watcher.bindings_changed.connect(self.on_hosts_bindings_changed)
+        self.hosts_watcher.start()
+    
+    def start_pre_resolve(self):
+        """在后台预解析所有问题域名的IP，修复时直接使用缓存结果"""
+        if self.pre_resolver:
+            return
+        self.pre_resolver = PreResolveWorker()
+        self.pre_resolver.progress_updated.connect(self.on_pre_resolve_progress)
+        self.pre_resolver.resolved.connect(self.on_pre_resolve_finished)
+        self.status_resolve.setText(f"IP预解析: 0/{len(self.pre_resolver.domains)}")
+        self.pre_resolver.start(QThread.Priority.LowPriority)
+    
+    def on_pre_resolve_progress(self, done: int, total: int):
+        """接收预解析进度"""
+        self.status_resolve.setText(f"IP预解析: {done}/{total}")
+    
+    def on_pre_resolve_finished(self, results: dict):
+        """预解析完成"""
+        success = sum(1 for ip, _ in results.values() if ip)
+        if success == len(results):
+            self.status_resolve.setText("IP预解析: ✓ 已完成")
+        else:
+            self.status_resolve.setText(f"IP预解析: {success}/{len(results)} 成功")
+    
+    def on_hosts_bindings_changed(self, bindings: dict):
+        """接收hosts监听推送的绑定"""
+        self.on_hosts_check_result(len(bindings))
+    
     def on_hosts_worker_finished(self):
         """线程完成时的清理"""
         if self.hosts_worker:
@@ -313,6 +355,23 @@ class MainWindow(QMainWindow):
             self.hosts_worker.deleteLater()
             self.hosts_worker = None
         
+        # 停止hosts文件监听（等待间隔为0.5秒，通常很快退出）
+        if self.hosts_watcher:
+            self.hosts_watcher.stop()
+            if not self.hosts_watcher.wait(2000):
+                self.hosts_watcher.terminate()
+                self.hosts_watcher.wait(1000)
+            self.hosts_watcher.deleteLater()
+            self.hosts_watcher = None
+        
+        # 停止IP预解析：取消正在进行的查询和测速后等待线程结束
+        # （不强制终止，避免中断缓存文件的写入）
+        if self.pre_resolver:
+            self.pre_resolver.stop()
+            self.pre_resolver.wait()
+            self.pre_resolver.deleteLater()
+            self.pre_resolver = None
+        
         # 接受关闭事件
         event.accept()
 
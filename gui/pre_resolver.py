@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IP预解析线程
+程序启动后在后台（低优先级）逐个获取所有问题域名的IP并测速，结果写入解析缓存，
+之后点击问题卡片修复时直接使用缓存结果，只需修改hosts文件
+"""
+
+import os
+import sys
+import threading
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# 添加路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.bind_hosts import PROBLEM_DOMAINS
+from hosts.get_domain_ip import get_domain_ip_with_source
+
+
+def get_all_problem_domains():
+    """所有问题类型涉及的域名（去重，保持顺序）"""
+    return list(dict.fromkeys(
+        domain for domains in PROBLEM_DOMAINS.values() for domain in domains
+    ))
+
+
+class PreResolveWorker(QThread):
+    """后台线程：预解析所有问题域名的IP（缓存有效的域名不重新获取）"""
+    progress_updated = pyqtSignal(int, int)  # (已完成数量, 总数)
+    resolved = pyqtSignal(dict)  # 全部完成后发送 {域名: (IP, 来源)}
+
+    def __init__(self, domains=None, parent=None):
+        super().__init__(parent)
+        self.domains = list(domains) if domains else get_all_problem_domains()
+        # 取消事件传入解析过程，正在进行的查询和测速也会尽快结束
+        self._cancel = threading.Event()
+
+    def stop(self):
+        """请求停止线程（不等待正在进行的查询和测速，结果不写入缓存）"""
+        self._cancel.set()
+
+    def run(self):
+        """在后台线程中执行"""
+        # 逐个域名获取（每个域名内部的查询和测速本身是并发的），
+        # 占用网络较少
+        results = {}
+        total = len(self.domains)
+        for done, domain in enumerate(self.domains, 1):
+            if self._cancel.is_set():
+                return
+            try:
+                # 与修复时的获取方式一致（使用配置、测速选择），结果写入缓存
+                results[domain] = get_domain_ip_with_source(domain, use_config=True, rank=True,
+                                                            cancel=self._cancel)
+            except Exception as e:
+                print(f"预解析 {domain} 的IP失败: {e}")  # 不阻塞，只打印日志
+                results[domain] = (None, "失败")
+            if self._cancel.is_set():
+                return
+            self.progress_updated.emit(done, total)
+        self.resolved.emit(results)
@@ -21,7 +21,9 @@ from gui.image_viewer import ClickableImageLabel
 
 from hosts.bind_hosts import bind_by_problem, PROBLEM_DOMAINS
 from hosts.unbind_hosts import unbind_domain
-from hosts.get_domain_ip import get_domain_ip, get_domain_ip_with_source
+from hosts.hosts_transaction import HostsTransaction, ALREADY_APPLIED_MESSAGE
+from hosts.get_domain_ip import resolve_many
+from hosts.ip_probe import format_probe, format_latency
 from browser.clear_dns import clear_dns
 
 
@@ -97,6 +99,8 @@ class FixWorker(QThread):
         super().__init__()
         self.problem_type = problem_type
         self.auto_fix = auto_fix
+        # (域名, IP) -> 测速结果
+        self.probe_results = {}
     
     def run(self):
         """执行修复"""
@@ -104,7 +108,17 @@ class FixWorker(QThread):
             if self.problem_type == 'unbind_preview':
                 # 解绑操作
                 self.progress_updated.emit(25, "正在解绑域名...")
-                success = unbind_domain('preview.qiantucdn.com', auto_fix=self.auto_fix)
+                txn = HostsTransaction()
+                success = unbind_domain('preview.qiantucdn.com', transaction=txn)
+                if success and txn.is_noop:
+                    # 已经是解绑状态：不写入、不请求权限、不清除DNS缓存
+                    self.progress_updated.emit(100, "无需修改")
+                    self.finished.emit(True, f"preview.qiantucdn.com 未绑定，{ALREADY_APPLIED_MESSAGE}")
+                    return
+                if success and self.auto_fix:
+                    success, error_msg = txn.commit()
+                    if not success:
+                        raise Exception(error_msg)
                 if success:
                     self.progress_updated.emit(75, "正在清除DNS缓存...")
                     clear_dns()
@@ -126,9 +140,14 @@ class FixWorker(QThread):
                     self.finished.emit(False, f"未知的问题类型: {self.problem_type}")
                     return
                 
-                # 获取IP（对于多个域名，获取第一个域名的IP作为参考显示）
+                # 所有域名并发获取候选IP并从本机测速（结果交给绑定步骤，不再重复查询；
+                # 启动时已预解析且缓存有效的域名直接使用缓存的测速结果）
+                # 对于多个域名，显示第一个域名的IP作为参考
+                self.probe_results = {}
+                resolved = resolve_many(domains, use_config=True, rank=True,
+                                        progress=self.on_probe_result)
                 domain = domains[0]
-                ip, source = get_domain_ip_with_source(domain, use_config=True)
+                ip, source = resolved[domain]
                 
                 if not ip:
                     self.finished.emit(False, f"无法获取 {domain} 的IP地址")
@@ -148,6 +167,9 @@ class FixWorker(QThread):
                 elif source == "ipapi.co":
                     source_text = f"✓ 已从ipapi.co获取IP: {ip}"
                     self.progress_updated.emit(30, f"已从ipapi.co获取IP: {ip}")
+                elif source == "公共DNS":
+                    source_text = f"✓ 已通过公共DNS获取IP: {ip}"
+                    self.progress_updated.emit(30, f"已通过公共DNS获取IP: {ip}")
                 elif source == "Ping测试":
                     source_text = f"✓ 已通过Ping测试获取IP: {ip}"
                     self.progress_updated.emit(30, f"已通过Ping测试获取IP: {ip}")
@@ -155,16 +177,31 @@ class FixWorker(QThread):
                     source_text = f"✓ 已通过DNS查询获取IP: {ip}"
                     self.progress_updated.emit(30, f"已通过DNS查询获取IP: {ip}")
                 
+                # 附上本机测速结果
+                probe = self.probe_results.get((domain, ip))
+                if probe and probe.get('ok'):
+                    source_text += f"（本机测速 {format_latency(probe)}）"
+                
                 # 通过信号发送IP信息（需要在worker中处理）
                 if len(domains) > 1:
                     # 多域名时显示所有域名
                     source_text += f" (将绑定 {len(domains)} 个域名)"
                 self.progress_updated.emit(31, f"IP_INFO:{source_text}")
-                self.progress_updated.emit(40, "正在备份hosts文件...")
                 
-                # 执行绑定（bind_by_problem会处理所有域名）
-                self.progress_updated.emit(60, "正在修改hosts文件...")
-                success = bind_by_problem(self.problem_type, auto_fix=self.auto_fix, use_config=True)
+                # 所有域名的修改在同一个事务中完成，只写入（提权）一次
+                txn = HostsTransaction()
+                success = bind_by_problem(self.problem_type, use_config=True, transaction=txn,
+                                          resolved=resolved)
+                if success and txn.is_noop:
+                    # 绑定都已存在且IP相同：不写入、不请求权限、不清除DNS缓存
+                    self.progress_updated.emit(100, "无需修改")
+                    self.finished.emit(True, f"域名绑定已存在: {', '.join(domains)}\n{ALREADY_APPLIED_MESSAGE}")
+                    return
+                if success and self.auto_fix:
+                    self.progress_updated.emit(60, "正在修改hosts文件...")
+                    success, error_msg = txn.commit()
+                    if not success:
+                        raise Exception(error_msg)
                 
                 if success:
                     self.progress_updated.emit(80, "正在清除DNS缓存...")
@@ -181,6 +218,11 @@ class FixWorker(QThread):
                 self.finished.emit(False, f"修复失败: {error_msg}\n\n提示: 如果取消了密码输入，请重试并输入密码。")
             else:
                 self.finished.emit(False, f"修复过程中出错: {error_msg}")
+    
+    def on_probe_result(self, domain: str, result: dict):
+        """测速回调（在测速线程中调用，信号会排队到界面线程）"""
+        self.probe_results[(domain, result['ip'])] = result
+        self.progress_updated.emit(20, f"测速 {domain} {format_probe(result)}")
 
 
 class ProblemDialog(QDialog):
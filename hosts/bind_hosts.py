@@ -7,17 +7,14 @@ Hosts绑定工具
 
 import os
 import sys
-import platform
-import shutil
-from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Dict, List, Optional, Tuple
 
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from hosts.check_hosts import get_hosts_path, read_hosts, parse_hosts_entry
-from hosts.get_domain_ip import get_domain_ip
-from utils.elevate_permission import check_permission, elevate_write_file, elevate_copy_file
+from hosts.domain_matcher import DomainMatcher
+from hosts.hosts_transaction import HostsTransaction, commit_transaction, ALREADY_APPLIED_MESSAGE
+from hosts.get_domain_ip import resolve_many
 
 # 问题类型到域名的映射
 PROBLEM_DOMAINS = {
@@ -30,90 +27,23 @@ PROBLEM_DOMAINS = {
     'download_fail': ['proxy-rar.58pic.com', 'proxy-vip.58pic.com', 'proxy-vd.58pic.com'],  # 下载失败
 }
 
-
-def backup_hosts(hosts_path: str) -> str:
-    """备份hosts文件（支持权限提升）"""
-    backup_path = f"{hosts_path}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    
-    # 先尝试直接备份
-    if check_permission():
-        try:
-            shutil.copy2(hosts_path, backup_path)
-            print(f"✓ 已备份hosts文件到: {backup_path}")
-            return backup_path
-        except Exception as e:
-            print(f"✗ 备份hosts文件失败: {e}")
-            # 如果失败，尝试权限提升
-            print(f"需要管理员权限，正在请求权限...")
-            success, error_msg = elevate_copy_file(hosts_path, backup_path)
-            if success:
-                print(f"✓ 已备份hosts文件到: {backup_path}（已获取管理员权限）")
-                return backup_path
-            else:
-                print(f"✗ 备份失败: {error_msg}")
-                raise Exception(f"备份失败: {error_msg}")
-    else:
-        # 没有权限，使用权限提升
-        print(f"需要管理员权限来备份hosts文件，正在请求权限...")
-        success, error_msg = elevate_copy_file(hosts_path, backup_path)
-        if success:
-            print(f"✓ 已备份hosts文件到: {backup_path}（已获取管理员权限）")
-            return backup_path
-        else:
-            print(f"✗ 备份失败: {error_msg}")
-            raise Exception(f"备份失败: {error_msg}")
-
-
-def is_domain_bound(domain: str, lines: List[str]) -> bool:
-    """检查域名是否已绑定"""
-    for line in lines:
-        ip, parsed_domain = parse_hosts_entry(line)
-        if parsed_domain == domain:
-            return True
-    return False
+# 域名 -> 问题类型 的匹配器（子域名归属到其父域名的问题类型）
+PROBLEM_MATCHER = DomainMatcher({
+    domain: problem_type
+    for problem_type, domains in PROBLEM_DOMAINS.items()
+    for domain in domains
+})
 
 
-def add_hosts_entry(domain: str, ip: str, lines: List[str]) -> List[str]:
-    """
-    添加hosts条目
-    
-    Args:
-        domain: 域名
-        ip: IP地址
-        lines: 现有hosts文件行列表
-        
-    Returns:
-        更新后的行列表
-    """
-    # 检查是否已存在
-    if is_domain_bound(domain, lines):
-        # 更新现有条目
-        new_lines = []
-        updated = False
-        for line in lines:
-            parsed_ip, parsed_domain = parse_hosts_entry(line)
-            if parsed_domain == domain:
-                if not updated:
-                    # 替换为新的IP
-                    new_lines.append(f"{ip}\t{domain}\n")
-                    updated = True
-                # 跳过旧的条目
-                continue
-            new_lines.append(line)
-        
-        if updated:
-            print(f"✓ 已更新域名绑定: {domain} -> {ip}")
-        return new_lines
-    else:
-        # 添加新条目
-        entry = f"{ip}\t{domain}\n"
-        lines.append(entry)
-        print(f"✓ 已添加域名绑定: {domain} -> {ip}")
-        return lines
+def get_problem_type(domain: str) -> Optional[str]:
+    """返回域名对应的问题类型，不属于任何问题返回None"""
+    return PROBLEM_MATCHER.owner(domain)
 
 
 def bind_domains(domains: List[str], auto_fix: bool = False, 
-                 use_config: bool = True) -> bool:
+                 use_config: bool = True,
+                 transaction: Optional[HostsTransaction] = None,
+                 resolved: Optional[Dict[str, Tuple[Optional[str], str]]] = None) -> bool:
     """
     绑定域名到hosts文件
     
@@ -121,18 +51,24 @@ def bind_domains(domains: List[str], auto_fix: bool = False,
         domains: 域名列表
         auto_fix: 是否自动修改hosts文件
         use_config: 是否优先使用配置文件中的IP
+        transaction: 批量修改事务，传入时只记录修改，由调用方统一提交
+        resolved: 已获取的 {域名: (IP, 来源)}（resolve_many的结果），其中的域名不再重复查询
         
     Returns:
         是否成功
     """
-    hosts_path = get_hosts_path()
-    lines = read_hosts()
+    txn = transaction or HostsTransaction()
+    
+    # 获取每个域名的IP（未提供结果的域名并发查询）
+    resolved = dict(resolved or {})
+    missing = [domain for domain in domains if domain not in resolved]
+    if missing:
+        print(f"\n正在获取 {', '.join(missing)} 的IP地址...")
+        resolved.update(resolve_many(missing, use_config=use_config))
     
-    # 获取每个域名的IP
     domain_ips = {}
     for domain in domains:
-        print(f"\n正在获取 {domain} 的IP地址...")
-        ip = get_domain_ip(domain, use_config=use_config)
+        ip, _ = resolved.get(domain, (None, "失败"))
         if not ip:
             print(f"✗ 无法获取 {domain} 的IP地址，跳过")
             continue
@@ -142,85 +78,27 @@ def bind_domains(domains: List[str], auto_fix: bool = False,
         print("\n✗ 没有成功获取任何域名的IP地址")
         return False
     
-    # 添加hosts条目
-    new_lines = lines.copy()
+    # 添加hosts条目（通过索引直接定位，无需重复扫描整个文件）
     for domain, ip in domain_ips.items():
-        new_lines = add_hosts_entry(domain, ip, new_lines)
+        status = txn.bind(domain, ip)
+        if status == 'added':
+            print(f"✓ 已添加域名绑定: {domain} -> {ip}")
+        elif status == 'updated':
+            print(f"✓ 已更新域名绑定: {domain} -> {ip}")
+        else:
+            print(f"✓ 域名绑定已存在: {domain} -> {ip}")
+    
+    if transaction is not None:
+        # 由调用方统一提交
+        return True
+    
+    if txn.is_noop:
+        # 绑定都已存在，不备份、不写入、不请求权限
+        print(f"\n✓ {ALREADY_APPLIED_MESSAGE}")
+        return True
     
     if auto_fix:
-        # 备份原文件（会自动处理权限）
-        try:
-            backup_path = backup_hosts(hosts_path)
-        except Exception as e:
-            print(f"\n✗ 备份失败: {e}")
-            return False
-        
-        # 准备文件内容
-        file_content = ''.join(new_lines)
-        
-        # 尝试写入文件
-        try:
-            # 先尝试直接写入（如果有权限）
-            if check_permission():
-                with open(hosts_path, 'w', encoding='utf-8') as f:
-                    f.write(file_content)
-                print(f"\n✓ 已成功更新hosts文件")
-                print(f"✓ 共绑定 {len(domain_ips)} 个域名")
-                return True
-            else:
-                # 没有权限，使用权限提升工具（类似SwitchHosts!）
-                print(f"\n需要管理员权限来修改hosts文件，正在请求权限...")
-                success, error_msg = elevate_write_file(hosts_path, file_content)
-                if success:
-                    print(f"\n✓ 已成功更新hosts文件（已获取管理员权限）")
-                    print(f"✓ 共绑定 {len(domain_ips)} 个域名")
-                    return True
-                else:
-                    print(f"\n✗ 错误: 无法获取管理员权限")
-                    print(f"错误信息: {error_msg}")
-                    # 尝试恢复备份
-                    try:
-                        if check_permission():
-                            shutil.copy2(backup_path, hosts_path)
-                        else:
-                            elevate_copy_file(backup_path, hosts_path)
-                        print(f"已恢复备份文件")
-                    except:
-                        pass
-                    return False
-        except PermissionError:
-            # 如果直接写入失败，尝试权限提升
-            print(f"\n需要管理员权限来修改hosts文件，正在请求权限...")
-            success, error_msg = elevate_write_file(hosts_path, file_content)
-            if success:
-                print(f"\n✓ 已成功更新hosts文件（已获取管理员权限）")
-                print(f"✓ 共绑定 {len(domain_ips)} 个域名")
-                return True
-            else:
-                print(f"\n✗ 错误: 无法获取管理员权限")
-                print(f"错误信息: {error_msg}")
-                # 尝试恢复备份
-                try:
-                    if check_permission():
-                        shutil.copy2(backup_path, hosts_path)
-                    else:
-                        elevate_copy_file(backup_path, hosts_path)
-                    print(f"已恢复备份文件")
-                except:
-                    pass
-                return False
-        except Exception as e:
-            print(f"\n✗ 修改hosts文件失败: {e}")
-            # 尝试恢复备份
-            try:
-                if check_permission():
-                    shutil.copy2(backup_path, hosts_path)
-                else:
-                    elevate_copy_file(backup_path, hosts_path)
-                print(f"已恢复备份文件")
-            except:
-                pass
-            return False
+        return commit_transaction(txn, f"共绑定 {len(domain_ips)} 个域名")
     else:
         # 只显示预览
         print("\n预览修改后的hosts文件内容（新增/更新的条目）:")
@@ -233,7 +111,9 @@ def bind_domains(domains: List[str], auto_fix: bool = False,
 
 
 def bind_by_problem(problem_type: str, auto_fix: bool = False, 
-                   use_config: bool = True) -> bool:
+                   use_config: bool = True,
+                   transaction: Optional[HostsTransaction] = None,
+                   resolved: Optional[Dict[str, Tuple[Optional[str], str]]] = None) -> bool:
     """
     根据问题类型绑定域名
     
@@ -241,6 +121,8 @@ def bind_by_problem(problem_type: str, auto_fix: bool = False,
         problem_type: 问题类型（preview/js/icon/download/cloud/download_fail）
         auto_fix: 是否自动修改hosts文件
         use_config: 是否优先使用配置文件中的IP
+        transaction: 批量修改事务，传入时只记录修改，由调用方统一提交
+        resolved: 已获取的 {域名: (IP, 来源)}，其中的域名不再重复查询
         
     Returns:
         是否成功
@@ -254,7 +136,47 @@ def bind_by_problem(problem_type: str, auto_fix: bool = False,
     print(f"问题类型: {problem_type}")
     print(f"需要绑定的域名: {', '.join(domains)}")
     
-    return bind_domains(domains, auto_fix=auto_fix, use_config=use_config)
+    return bind_domains(domains, auto_fix=auto_fix, use_config=use_config,
+                        transaction=transaction, resolved=resolved)
+
+
+def bind_problems(problem_types: List[str], auto_fix: bool = False,
+                  use_config: bool = True) -> bool:
+    """
+    一次修复多个问题（所有修改在同一个事务中，只写入一次）
+    
+    Args:
+        problem_types: 问题类型列表
+        auto_fix: 是否自动修改hosts文件
+        use_config: 是否优先使用配置文件中的IP
+        
+    Returns:
+        是否成功
+    """
+    # 所有问题涉及的域名一次并发查询
+    domains = [d for problem_type in problem_types for d in PROBLEM_DOMAINS.get(problem_type, [])]
+    resolved = resolve_many(domains, use_config=use_config)
+    
+    txn = HostsTransaction()
+    for problem_type in problem_types:
+        if not bind_by_problem(problem_type, use_config=use_config, transaction=txn,
+                               resolved=resolved):
+            return False
+    
+    if txn.is_noop:
+        print(f"\n✓ {ALREADY_APPLIED_MESSAGE}")
+        return True
+    
+    if auto_fix:
+        return commit_transaction(txn, f"共修复 {len(problem_types)} 个问题")
+    
+    print("\n预览修改后的hosts文件内容（新增/更新的条目）:")
+    print("-" * 60)
+    for action, domain, ip in txn.changes:
+        print(f"{ip}\t{domain}")
+    print("-" * 60)
+    print("\n提示: 使用 --auto-fix 参数自动应用修改")
+    return True
 
 
 def main():
@@ -262,8 +184,8 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='绑定域名到hosts文件')
-    parser.add_argument('--problem', choices=list(PROBLEM_DOMAINS.keys()),
-                       help='问题类型: preview/js/icon/download/cloud/download_fail')
+    parser.add_argument('--problem', choices=list(PROBLEM_DOMAINS.keys()), nargs='+',
+                       help='问题类型（可指定多个，一次写入）: preview/js/icon/download/cloud/download_fail')
     parser.add_argument('--domain', action='append', 
                        help='要绑定的域名（可多次使用）')
     parser.add_argument('--auto-fix', action='store_true',
@@ -278,8 +200,8 @@ def main():
     print("=" * 60)
     
     if args.problem:
-        success = bind_by_problem(args.problem, auto_fix=args.auto_fix, 
-                                 use_config=not args.no_config)
+        success = bind_problems(args.problem, auto_fix=args.auto_fix, 
+                                use_config=not args.no_config)
     elif args.domain:
         success = bind_domains(args.domain, auto_fix=args.auto_fix,
                               use_config=not args.no_config)
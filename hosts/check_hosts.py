@@ -11,6 +11,13 @@ import platform
 import re
 from typing import List, Dict, Tuple, Optional
 
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.domain_matcher import DomainMatcher
+from hosts.hosts_cache import cached
+from hosts.scan_hosts import root_suffixes, scan_hosts
+
 # 千图相关域名列表
 QIANTU_DOMAINS = [
     'preview.qiantucdn.com',
@@ -25,6 +32,12 @@ QIANTU_DOMAINS = [
     'qiantucdn.com'
 ]
 
+# 千图域名匹配器（编译一次，匹配耗时只与域名标签数有关）
+QIANTU_MATCHER = DomainMatcher(QIANTU_DOMAINS)
+
+# 流式扫描时的预过滤关键字（QIANTU_DOMAINS的最小后缀集合）
+QIANTU_NEEDLES = root_suffixes(QIANTU_DOMAINS)
+
 
 def get_hosts_path() -> str:
     """获取hosts文件路径"""
@@ -39,27 +52,38 @@ def get_hosts_path() -> str:
         raise OSError(f"不支持的操作系统: {system}")
 
 
-def read_hosts(max_lines: int = None) -> List[str]:
+def _read_lines(hosts_path: str, max_lines: int = None) -> List[str]:
+    """读取hosts文件行（出错时抛出异常）"""
+    # 使用更快的读取方式
+    with open(hosts_path, 'r', encoding='utf-8', errors='ignore') as f:
+        if max_lines:
+            # 只读取前N行（对于大文件优化）
+            lines = []
+            for i, line in enumerate(f):
+                if i >= max_lines:
+                    break
+                lines.append(line)
+            return lines
+        else:
+            return f.readlines()
+
+
+def read_hosts(max_lines: int = None, hosts_path: Optional[str] = None) -> List[str]:
     """
     读取hosts文件内容（优化版本，不阻塞启动）
     
+    读取整个文件时使用解析缓存，文件未变化则不再重复读取。
+    
     Args:
         max_lines: 最大读取行数，None表示读取全部（用于大文件优化）
+        hosts_path: hosts文件路径，None表示系统默认路径
     """
-    hosts_path = get_hosts_path()
+    hosts_path = hosts_path or get_hosts_path()
     try:
-        # 使用更快的读取方式，添加错误处理
-        with open(hosts_path, 'r', encoding='utf-8', errors='ignore') as f:
-            if max_lines:
-                # 只读取前N行（对于大文件优化）
-                lines = []
-                for i, line in enumerate(f):
-                    if i >= max_lines:
-                        break
-                    lines.append(line)
-                return lines
-            else:
-                return f.readlines()
+        if max_lines:
+            return _read_lines(hosts_path, max_lines)
+        lines = cached(hosts_path, 'lines', lambda: tuple(_read_lines(hosts_path)))
+        return list(lines)
     except PermissionError:
         # 不退出程序，返回空列表（GUI模式下不应该退出）
         print(f"警告: 没有权限读取hosts文件: {hosts_path}")
@@ -103,35 +127,67 @@ def parse_hosts_entry(line: str) -> Tuple[Optional[str], Optional[str]]:
     return None, None
 
 
-def check_hosts(max_lines: int = 1000) -> Dict[str, Dict[str, str]]:
+def is_qiantu_domain(domain: str) -> bool:
+    """检查域名是否属于千图相关域名（本身或其子域名）"""
+    return domain in QIANTU_MATCHER
+
+
+def check_hosts(max_lines: Optional[int] = None, hosts=None) -> Dict[str, Dict[str, str]]:
     """
-    检查hosts文件中的千图相关域名配置（优化版本）
+    检查hosts文件中的千图相关域名配置
+    
+    默认流式扫描整个文件：按块读取字节并用子串搜索预过滤，
+    只解析包含千图域名的行，几MB的hosts文件也只需几毫秒。
     
     Args:
-        max_lines: 最大读取行数，默认1000行（对于大文件优化）
+        max_lines: 最大扫描行数，None表示扫描整个文件
+        hosts: 已加载的HostsFile模型，传入时不再重新读取文件
     
     Returns:
         字典，键为域名，值为包含ip和line_num的字典
     """
-    # 对于大文件，只读取前N行（通常hosts绑定在前几行）
-    lines = read_hosts(max_lines=max_lines)
     results = {}
     
-    for line_num, line in enumerate(lines, 1):
-        ip, domain = parse_hosts_entry(line)
-        
-        if domain:
+    if hosts is not None:
+        for domain, ip, line_num, raw_line in hosts.entries():
             # 检查是否是千图相关域名
-            for qiantu_domain in QIANTU_DOMAINS:
-                if domain == qiantu_domain or domain.endswith('.' + qiantu_domain):
-                    if domain not in results:
-                        results[domain] = {
-                            'ip': ip,
-                            'line': line_num,
-                            'raw_line': line.strip()
-                        }
-                    break
+            if is_qiantu_domain(domain):
+                results[domain] = {
+                    'ip': ip,
+                    'line': line_num,
+                    'raw_line': raw_line
+                }
+        return results
     
+    hosts_path = get_hosts_path()
+    try:
+        if max_lines:
+            results = _scan_qiantu(hosts_path, max_lines)
+        else:
+            results = cached(hosts_path, 'qiantu', lambda: _scan_qiantu(hosts_path))
+    except PermissionError:
+        print(f"警告: 没有权限读取hosts文件: {hosts_path}")
+    except FileNotFoundError:
+        print(f"警告: hosts文件不存在: {hosts_path}")
+    except Exception as e:
+        print(f"读取hosts文件失败: {e}")
+    
+    # 返回副本，避免调用方修改缓存内容
+    return {domain: dict(info) for domain, info in results.items()}
+
+
+def _scan_qiantu(hosts_path: str, max_lines: Optional[int] = None) -> Dict[str, Dict[str, str]]:
+    """流式扫描hosts文件中的千图相关绑定（出错时抛出异常）"""
+    results = {}
+    for line_num, raw in scan_hosts(QIANTU_NEEDLES, hosts_path, max_lines=max_lines):
+        line = raw.decode('utf-8', errors='ignore')
+        ip, domain = parse_hosts_entry(line)
+        if domain and domain not in results and is_qiantu_domain(domain):
+            results[domain] = {
+                'ip': ip,
+                'line': line_num,
+                'raw_line': line.strip()
+            }
     return results
 
 
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DNS查询客户端
+直接向上游DNS服务器查询A记录（不经过系统解析器和hosts文件），
+支持UDP、TCP和DNS-over-HTTPS，多个服务器并行查询，返回所有A记录及TTL
+
+服务器地址格式:
+    223.5.5.5 / udp://223.5.5.5:53    UDP（响应被截断时自动改用TCP）
+    tcp://119.29.29.29                TCP
+    https://doh.pub/dns-query         DNS-over-HTTPS（RFC 8484）
+"""
+
+import os
+import sys
+import json
+import random
+import socket
+import struct
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESOLVERS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'config', 'dns_resolvers.json')
+
+# 配置文件不存在时使用的DNS服务器
+DEFAULT_RESOLVERS = [
+    'udp://223.5.5.5',
+    'udp://119.29.29.29',
+    'https://dns.alidns.com/dns-query',
+    'https://doh.pub/dns-query',
+]
+
+# 单个服务器的查询超时（秒）
+DNS_TIMEOUT = 3.0
+
+TYPE_A = 1
+CLASS_IN = 1
+FLAG_TC = 0x0200
+
+_HEADER = struct.Struct('!HHHHHH')
+
+
+class DNSError(Exception):
+    """DNS查询失败"""
+
+
+def load_resolvers() -> List[str]:
+    """读取DNS服务器列表（config/dns_resolvers.json），没有配置时使用默认列表"""
+    try:
+        with open(RESOLVERS_PATH, 'r', encoding='utf-8') as f:
+            resolvers = json.load(f).get('resolvers')
+        if resolvers:
+            return list(resolvers)
+    except FileNotFoundError:
+        pass
+    except (ValueError, AttributeError):
+        print(f"警告: 配置文件 {RESOLVERS_PATH} 格式错误")
+    return list(DEFAULT_RESOLVERS)
+
+
+def build_query(name: str, query_id: int, qtype: int = TYPE_A) -> bytes:
+    """构造DNS查询报文（请求递归）"""
+    qname = b''.join(
+        bytes([len(label)]) + label
+        for label in name.strip().rstrip('.').encode('idna').split(b'.')
+    ) + b'\0'
+    return _HEADER.pack(query_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack('!HH', qtype, CLASS_IN)
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    """跳过报文中的域名（支持压缩指针），返回其后的位置"""
+    while True:
+        if offset >= len(data):
+            raise DNSError("报文不完整")
+        length = data[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        offset += length + 1
+
+
+def parse_response(data: bytes, query_id: Optional[int] = None) -> Tuple[List[Tuple[str, int]], bool]:
+    """
+    解析DNS响应
+
+    Returns:
+        ([(IP, TTL), ...], 是否被截断)
+
+    Raises:
+        DNSError: 报文错误或服务器返回错误码
+    """
+    if len(data) < _HEADER.size:
+        raise DNSError("报文不完整")
+    resp_id, flags, qdcount, ancount, _, _ = _HEADER.unpack_from(data)
+    if query_id is not None and resp_id != query_id:
+        raise DNSError("响应ID不匹配")
+    if flags & FLAG_TC:
+        return [], True
+    rcode = flags & 0x000F
+    if rcode == 3:
+        return [], False  # 域名不存在
+    if rcode != 0:
+        raise DNSError(f"服务器返回错误码 {rcode}")
+
+    offset = _HEADER.size
+    for _ in range(qdcount):
+        offset = _skip_name(data, offset) + 4
+
+    records = []
+    for _ in range(ancount):
+        offset = _skip_name(data, offset)
+        if offset + 10 > len(data):
+            raise DNSError("报文不完整")
+        rtype, rclass, ttl, rdlength = struct.unpack_from('!HHIH', data, offset)
+        offset += 10
+        if rtype == TYPE_A and rclass == CLASS_IN and rdlength == 4:
+            records.append((socket.inet_ntoa(data[offset:offset + 4]), ttl))
+        offset += rdlength
+    return records, False
+
+
+def _parse_resolver(resolver: str) -> Tuple[str, str, int]:
+    """解析服务器地址 -> (协议, 主机, 端口)"""
+    if '://' not in resolver:
+        resolver = f"udp://{resolver}"
+    parsed = urlparse(resolver)
+    scheme = parsed.scheme.lower()
+    if scheme == 'https':
+        return scheme, resolver, parsed.port or 443
+    return scheme, parsed.hostname, parsed.port or 53
+
+
+def _query_udp(host: str, port: int, query: bytes, timeout: float) -> bytes:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(query, (host, port))
+        data, _ = sock.recvfrom(4096)
+        return data
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise DNSError("连接被关闭")
+        data += chunk
+    return data
+
+
+def _query_tcp(host: str, port: int, query: bytes, timeout: float) -> bytes:
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(struct.pack('!H', len(query)) + query)
+        length, = struct.unpack('!H', _recv_exact(sock, 2))
+        return _recv_exact(sock, length)
+
+
+def _query_doh(url: str, query: bytes, timeout: float) -> bytes:
+    from utils.http_client import http_post
+    response = http_post(url, data=query, timeout=(timeout, timeout), headers={
+        'Content-Type': 'application/dns-message',
+        'Accept': 'application/dns-message',
+    })
+    if response.status_code != 200:
+        raise DNSError(f"HTTP {response.status_code}")
+    return response.content
+
+
+def query_a(name: str, resolver: str, timeout: float = DNS_TIMEOUT) -> List[Tuple[str, int]]:
+    """
+    向一个DNS服务器查询A记录
+
+    Returns:
+        [(IP, TTL), ...]（域名不存在时为空列表）
+
+    Raises:
+        DNSError / OSError: 查询失败
+    """
+    scheme, host, port = _parse_resolver(resolver)
+    query_id = random.randint(0, 0xFFFF)
+    query = build_query(name, query_id)
+
+    if scheme == 'udp':
+        records, truncated = parse_response(_query_udp(host, port, query, timeout), query_id)
+        if not truncated:
+            return records
+        scheme = 'tcp'  # 响应被截断，改用TCP重新查询
+    if scheme == 'tcp':
+        records, _ = parse_response(_query_tcp(host, port, query, timeout), query_id)
+        return records
+    if scheme == 'https':
+        # DoH报文ID建议为0（便于HTTP缓存）
+        query = build_query(name, 0)
+        records, _ = parse_response(_query_doh(host, query, timeout), 0)
+        return records
+    raise DNSError(f"不支持的协议: {resolver}")
+
+
+def resolve_a(name: str, resolvers: Optional[List[str]] = None,
+              timeout: float = DNS_TIMEOUT) -> List[Dict]:
+    """
+    并行向多个DNS服务器查询A记录并合并结果
+
+    Args:
+        name: 域名
+        resolvers: DNS服务器列表，默认读取配置
+        timeout: 单个服务器的查询超时（秒）
+
+    Returns:
+        [{'ip', 'ttl', 'resolvers'}, ...]，按返回先后排序；同一IP取最小TTL
+    """
+    resolvers = resolvers or load_resolvers()
+    merged: Dict[str, Dict] = {}
+
+    with ThreadPoolExecutor(max_workers=len(resolvers)) as executor:
+        futures = {executor.submit(query_a, name, resolver, timeout): resolver
+                   for resolver in resolvers}
+        for future in as_completed(futures):
+            resolver = futures[future]
+            try:
+                records = future.result()
+            except Exception as e:
+                print(f"DNS服务器 {resolver} 查询 {name} 失败: {e}")
+                continue
+            for ip, ttl in records:
+                entry = merged.setdefault(ip, {'ip': ip, 'ttl': ttl, 'resolvers': []})
+                entry['ttl'] = min(entry['ttl'], ttl)
+                entry['resolvers'].append(resolver)
+
+    return list(merged.values())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+域名映射配置（config/domain_mappings.json）
+配置文件只在首次使用和文件修改后解析，解析结果是只读快照，多线程共用
+
+每个域名的值可以是:
+    ""                                   没有配置IP，实时获取
+    "47.104.5.133"                       一个IP
+    ["47.104.5.133", "47.104.5.134"]     多个候选IP（按顺序优先）
+    {"ips": [                            带权重和有效期的候选IP
+        {"ip": "47.104.5.133", "weight": 10, "expires": "2026-12-31"},
+        "47.104.5.134"
+    ]}
+权重越大越优先（默认1，权重相同时按书写顺序）；过了有效期的IP自动忽略
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import ipaddress
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'config', 'domain_mappings.json')
+
+# 候选IP的默认权重
+DEFAULT_WEIGHT = 1
+
+# 候选IP: (IP, 权重, 过期时间戳或None)
+ConfigIP = Tuple[str, float, Optional[float]]
+
+
+class ConfigSnapshot:
+    """配置文件的只读快照"""
+
+    __slots__ = ('path', 'version', '_entries')
+
+    def __init__(self, path: str, version: Optional[Tuple[int, int]],
+                 entries: Dict[str, Tuple[ConfigIP, ...]]):
+        self.path = path
+        # 文件的 (修改时间, 大小)，文件不存在时为None
+        self.version = version
+        self._entries: Mapping[str, Tuple[ConfigIP, ...]] = MappingProxyType(entries)
+
+    def __contains__(self, domain: str) -> bool:
+        return domain in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def domains(self) -> List[str]:
+        """配置中的所有域名（包括没有配置IP的）"""
+        return list(self._entries)
+
+    def get_ips(self, domain: str, now: Optional[float] = None) -> List[str]:
+        """域名的有效候选IP，按优先级排序（已过期的不返回）"""
+        now = time.time() if now is None else now
+        return [ip for ip, _, expires in self._entries.get(domain, ())
+                if expires is None or expires > now]
+
+    def get_ip(self, domain: str, now: Optional[float] = None) -> Optional[str]:
+        """域名的首选IP，没有有效IP时返回None"""
+        ips = self.get_ips(domain, now)
+        return ips[0] if ips else None
+
+    def as_dict(self) -> Dict[str, str]:
+        """{域名: 首选IP}，没有有效IP的域名为空字符串（旧格式）"""
+        now = time.time()
+        return {domain: self.get_ip(domain, now) or '' for domain in self._entries}
+
+
+def _parse_expires(value) -> Optional[float]:
+    """有效期 -> 时间戳；只写日期时当天仍有效"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if len(text) == 10:
+        return datetime.strptime(text, '%Y-%m-%d').timestamp() + 24 * 3600
+    return datetime.fromisoformat(text).timestamp()
+
+
+def _parse_candidate(domain: str, item) -> Optional[ConfigIP]:
+    """解析一个候选IP，格式错误时打印警告并返回None"""
+    if isinstance(item, str):
+        item = {'ip': item}
+    if not isinstance(item, dict):
+        print(f"警告: 配置文件中 {domain} 的IP格式错误: {item!r}")
+        return None
+
+    ip = str(item.get('ip') or '').strip()
+    if not ip:
+        return None
+    try:
+        ipaddress.IPv4Address(ip)
+        weight = float(item.get('weight', DEFAULT_WEIGHT))
+        expires = _parse_expires(item.get('expires'))
+    except (ValueError, TypeError) as e:
+        print(f"警告: 配置文件中 {domain} 的IP {ip} 无效: {e}")
+        return None
+    return ip, weight, expires
+
+
+def parse_config(data) -> Dict[str, Tuple[ConfigIP, ...]]:
+    """
+    解析配置内容
+
+    Returns:
+        {域名: ((IP, 权重, 过期时间戳), ...)}，候选IP按权重从大到小排序
+    """
+    if not isinstance(data, dict):
+        raise ValueError("顶层必须是对象")
+
+    entries = {}
+    for domain, value in data.items():
+        if isinstance(value, dict) and 'ips' not in value:
+            value = [value]                     # {"ip": ..., "weight": ...}
+        elif isinstance(value, dict):
+            value = value.get('ips') or []
+        elif not isinstance(value, list):
+            value = [value]
+        candidates = [c for c in (_parse_candidate(domain, item) for item in value) if c]
+        # sorted是稳定排序，权重相同时保持书写顺序
+        entries[domain] = tuple(sorted(candidates, key=lambda c: -c[1]))
+    return entries
+
+
+def _file_version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+_lock = threading.Lock()
+_snapshots: Dict[str, ConfigSnapshot] = {}
+
+
+def get_config(path: str = CONFIG_PATH) -> ConfigSnapshot:
+    """
+    获取配置快照
+
+    每次调用只检查文件的修改时间和大小，文件变化后才重新解析；
+    新文件格式错误时打印警告并继续使用上一次的快照。
+    """
+    version = _file_version(path)
+    snapshot = _snapshots.get(path)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshots.get(path)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        if version is None:
+            entries = {}
+        else:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries = parse_config(json.load(f))
+            except FileNotFoundError:
+                entries = {}
+            except (OSError, ValueError) as e:
+                print(f"警告: 配置文件 {path} 格式错误: {e}")
+                # 记录新版本号，避免每次调用都重新解析同一个错误文件
+                entries = dict(snapshot._entries) if snapshot is not None else {}
+
+        snapshot = ConfigSnapshot(path, version, entries)
+        _snapshots[path] = snapshot
+        return snapshot
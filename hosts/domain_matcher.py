@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+域名集合匹配器
+按反向标签（com -> 58pic -> dl）组织的字典树，
+判断域名本身或其任一父域名是否在集合中，耗时只与标签数有关
+"""
+
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+# 字典树节点中存放匹配信息的键（域名标签不可能为空串）
+_END = ''
+
+
+def split_labels(domain: str) -> list:
+    """规范化域名并拆分为标签（小写，去掉末尾的点）"""
+    return domain.strip().rstrip('.').lower().split('.')
+
+
+def parent_domains(domain: str) -> Iterator[str]:
+    """
+    遍历域名的所有父域名（不含自身）
+
+    例如 'a.b.58pic.com' -> 'b.58pic.com', '58pic.com', 'com'
+    """
+    labels = split_labels(domain)
+    for i in range(1, len(labels)):
+        yield '.'.join(labels[i:])
+
+
+class DomainMatcher:
+    """
+    域名集合匹配器
+
+    每个域名可以关联一个归属（如问题类型），
+    匹配时返回最具体（最长）的那个集合成员。
+    """
+
+    def __init__(self, domains: Union[Iterable[str], Dict[str, Any]] = ()):
+        self._root: Dict[str, Any] = {}
+        self._size = 0
+        if isinstance(domains, dict):
+            for domain, owner in domains.items():
+                self.add(domain, owner)
+        else:
+            for domain in domains:
+                self.add(domain)
+
+    def add(self, domain: str, owner: Any = None):
+        """添加域名及其归属"""
+        node = self._root
+        for label in reversed(split_labels(domain)):
+            node = node.setdefault(label, {})
+        if _END not in node:
+            self._size += 1
+        node[_END] = ('.'.join(split_labels(domain)), owner)
+
+    def match(self, domain: str) -> Optional[Tuple[str, Any]]:
+        """
+        查找域名命中的集合成员
+
+        Returns:
+            (命中的集合成员, 归属)，未命中返回None
+        """
+        node = self._root
+        found = None
+        for label in reversed(split_labels(domain)):
+            node = node.get(label)
+            if node is None:
+                break
+            if _END in node:
+                found = node[_END]
+        return found
+
+    def owner(self, domain: str) -> Any:
+        """返回域名所属的归属，未命中返回None"""
+        found = self.match(domain)
+        return found[1] if found else None
+
+    def __contains__(self, domain: str) -> bool:
+        return self.match(domain) is not None
+
+    def __len__(self) -> int:
+        return self._size
@@ -6,46 +6,75 @@
 """
 
 import requests
-import json
 import os
 import sys
-from bs4 import BeautifulSoup
-from typing import Optional, Dict, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Dict, List, Tuple
 
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                           'config', 'domain_mappings.json')
+from hosts.ip_resolver import resolve_first, collect_all, find_consensus
+from hosts.dns_client import resolve_a
+from hosts.source_health import order_sources, tracked
+from hosts.ip_probe import rank_ips, latency_ms, format_probe
+from utils.http_client import http_get, http_post
+from hosts.ip_cache import get_cached_ip, store_ip, refresh_in_background
+from hosts.domain_config import get_config
+from utils.latency_probe import measure_latency
+
+
+# 测速回调: progress(域名, 测速结果)
+ProbeCallback = Callable[[str, Dict], None]
+
+# 每个来源最多提供的候选IP数量（测速选择时使用）
+MAX_CANDIDATES_PER_SOURCE = 5
 
 
 def load_config() -> Dict[str, str]:
-    """加载域名映射配置"""
-    try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-    except json.JSONDecodeError:
-        print(f"警告: 配置文件 {CONFIG_PATH} 格式错误")
-        return {}
+    """加载域名映射配置 {域名: 首选IP}（读取缓存的配置快照，文件修改后自动重新加载）"""
+    return get_config().as_dict()
 
 
 def get_ip_from_17ce(domain: str) -> Optional[str]:
     """
     从17ce.com获取域名的最优IP
     
+    Args:
+        domain: 域名
+        
+    Returns:
+        最优IP地址，如果获取失败返回None
+    """
+    ips = get_ips_from_17ce(domain)
+    return ips[0] if ips else None
+
+
+def get_ips_from_17ce(domain: str, limit: int = MAX_CANDIDATES_PER_SOURCE) -> List[str]:
+    """
+    从17ce.com获取域名的候选IP（按17ce节点响应时间排序）
+    
     尝试多种方式从17ce.com获取IP：
     1. 访问17ce.com的ping测试页面
     2. 解析返回的JSON或HTML数据
-    3. 提取最快的节点IP
+    3. 提取响应最快的若干节点IP
     
     Args:
         domain: 域名
+        limit: 最多返回的IP数量
         
     Returns:
-        最优IP地址，如果获取失败返回None
+        IPv4地址列表，如果获取失败返回空列表
     """
+    ips: List[str] = []
+    
+    def add(ip: str) -> bool:
+        """加入候选列表，达到数量上限时返回True"""
+        if ip not in ips:
+            ips.append(ip)
+        return len(ips) >= limit
+    
     try:
         # 方法1: 尝试访问17ce.com的ping测试API
         url = "http://17ce.com/site/ping"
@@ -61,65 +90,58 @@ def get_ip_from_17ce(domain: str) -> Optional[str]:
             'Content-Type': 'application/x-www-form-urlencoded',
         }
         
-        response = requests.post(url, data=data, headers=headers, timeout=15)
+        response = http_post(url, data=data, headers=headers, timeout=(5, 15))
         
         if response.status_code == 200:
             # 尝试解析返回的JSON
             try:
                 result = response.json()
                 if result.get('status') == 'success' and result.get('data'):
-                    # 找到最快的节点IP
                     nodes = result.get('data', [])
-                    if nodes:
-                        # 按响应时间排序，取最快的IPv4地址
-                        sorted_nodes = sorted(nodes, key=lambda x: x.get('time', 999))
-                        for node in sorted_nodes:
-                            ip = node.get('ip')
-                            if ip and is_ipv4(ip):  # 只使用IPv4地址
-                                return ip
-            except (ValueError, KeyError, TypeError):
+                    # 按响应时间排序，取最快的若干IPv4地址
+                    sorted_nodes = sorted(nodes, key=lambda x: x.get('time', 999))
+                    for node in sorted_nodes:
+                        ip = node.get('ip')
+                        if ip and is_ipv4(ip) and add(ip):  # 只使用IPv4地址
+                            return ips
+            except (ValueError, KeyError, TypeError, AttributeError):
                 pass
             
             # 如果不是JSON，尝试解析HTML
-            try:
-                soup = BeautifulSoup(response.text, 'html.parser')
+            if not ips:
                 import re
                 # 查找IP地址
                 ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-                matches = re.findall(ip_pattern, response.text)
-                if matches:
-                    # 验证IP格式并返回第一个有效的IPv4地址
-                    for match in matches:
-                        if is_ipv4(match):
-                            return match
-            except:
-                pass
+                for match in re.findall(ip_pattern, response.text):
+                    if is_ipv4(match) and add(match):
+                        return ips
+        
+        if ips:
+            return ips
         
         # 方法2: 尝试访问17ce.com的网站测速页面
         try:
             test_url = f"http://17ce.com/site/{domain}"
-            response = requests.get(test_url, headers=headers, timeout=10)
+            response = http_get(test_url, headers=headers, timeout=(5, 10))
             if response.status_code == 200:
                 import re
                 ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-                matches = re.findall(ip_pattern, response.text)
-                if matches:
-                    for match in matches:
-                        if is_ipv4(match):
-                            # 排除一些明显不是目标IP的地址（如127.0.0.1, 0.0.0.0等）
-                            if not match.startswith(('127.', '0.', '192.168.', '10.', '172.')):
-                                return match
+                for match in re.findall(ip_pattern, response.text):
+                    # 排除一些明显不是目标IP的地址（如127.0.0.1, 0.0.0.0等）
+                    if is_ipv4(match) and not match.startswith(('127.', '0.', '192.168.', '10.', '172.')):
+                        if add(match):
+                            break
         except:
             pass
         
-        return None
+        return ips
         
     except requests.exceptions.RequestException as e:
         print(f"从17ce.com获取IP失败（网络错误）: {e}")
-        return None
+        return ips
     except Exception as e:
         print(f"从17ce.com获取IP失败: {e}")
-        return None
+        return ips
 
 
 def get_ip_from_dns(domain: str) -> Optional[str]:
@@ -147,6 +169,24 @@ def get_ip_from_dns(domain: str) -> Optional[str]:
         return None
 
 
+def get_ips_from_public_dns(domain: str) -> List[str]:
+    """
+    并行向公共DNS服务器查询A记录（不经过本机hosts文件和系统解析器）
+    
+    服务器列表见 config/dns_resolvers.json。
+    
+    Returns:
+        IPv4地址列表
+    """
+    return [record['ip'] for record in resolve_a(domain) if is_ipv4(record['ip'])]
+
+
+def get_ip_from_public_dns(domain: str) -> Optional[str]:
+    """通过公共DNS服务器获取域名IP（取第一条A记录）"""
+    ips = get_ips_from_public_dns(domain)
+    return ips[0] if ips else None
+
+
 # 注意：已移除ping测试功能
 # 因为用户本地可能无法访问这些域名，ping测试会失败
 # 只使用第三方服务获取IP
@@ -177,7 +217,7 @@ def get_ip_from_ipapi(domain: str) -> Optional[str]:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_get(url, headers=headers, timeout=(5, 10))
         
         if response.status_code == 200:
             result = response.json()
@@ -206,7 +246,7 @@ def get_ip_from_ipapi_co(domain: str) -> Optional[str]:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_get(url, headers=headers, timeout=(5, 10))
         
         if response.status_code == 200:
             result = response.json()
@@ -220,9 +260,52 @@ def get_ip_from_ipapi_co(domain: str) -> Optional[str]:
         return None
 
 
+# 批量解析时同时查询的域名数量上限
+RESOLVE_WORKERS = 4
+
+# 第三方服务列表（默认优先级，实际顺序按健康度动态调整，第一个为首选来源）
+IP_SOURCES = [
+    ("17ce.com", get_ip_from_17ce),
+    ("ip-api.com", get_ip_from_ipapi),
+    ("ipapi.co", get_ip_from_ipapi_co),
+    ("公共DNS", get_ip_from_public_dns),
+]
+
+
+# 测速选择时的候选来源（17ce.com提供多个节点IP）
+CANDIDATE_SOURCES = [
+    ("17ce.com", get_ips_from_17ce),
+    ("ip-api.com", get_ip_from_ipapi),
+    ("ipapi.co", get_ip_from_ipapi_co),
+    ("公共DNS", get_ips_from_public_dns),
+]
+
+# 测速选择时收集候选IP的超时（秒），超时仍未返回的来源不再等待
+COLLECT_TIMEOUT = 8.0
+
+# 共识模式下达成共识所需的最少票数
+CONSENSUS_QUORUM = 2
+
+# 当前使用的IP（配置文件或上次选择的结果）比最快的IP慢不超过此值（毫秒）时继续使用，
+# 避免每次修复都因测速抖动更换IP
+RANK_TOLERANCE_MS = 10
+
+
+def _is_valid_result(result) -> bool:
+    """查询结果是否有效（单个IP或IP列表）"""
+    if isinstance(result, str):
+        return is_ipv4(result)
+    return any(isinstance(ip, str) and is_ipv4(ip) for ip in result or [])
+
+
+def _sources_by_health(sources: list) -> list:
+    """按健康度排序来源（跳过熔断中的来源），并记录每次查询的结果和耗时"""
+    return [(name, tracked(name, func, _is_valid_result)) for name, func in order_sources(sources)]
+
+
 def get_ip_from_multiple_sources(domain: str) -> Tuple[Optional[str], str]:
     """
-    从多个第三方服务获取IP地址
+    从多个第三方服务获取IP地址（并发查询，首个有效结果胜出）
     
     注意：用户本地可能无法访问这些域名，因此：
     - 不使用ping测试（本地无法访问域名）
@@ -235,23 +318,13 @@ def get_ip_from_multiple_sources(domain: str) -> Tuple[Optional[str], str]:
     Returns:
         (IP地址, 来源) 元组
     """
-    # 第三方服务列表（按优先级排序）
-    sources = [
-        ("17ce.com", get_ip_from_17ce),
-        ("ip-api.com", get_ip_from_ipapi),
-        ("ipapi.co", get_ip_from_ipapi_co),
-    ]
-    
-    for source_name, get_func in sources:
-        try:
-            print(f"正在从 {source_name} 获取 {domain} 的IP...")
-            ip = get_func(domain)
-            if ip and is_ipv4(ip):  # 确保是IPv4地址
-                print(f"从 {source_name} 获取成功: {domain} -> {ip}")
-                return ip, source_name
-        except Exception as e:
-            print(f"从 {source_name} 获取失败: {e}")
-            continue
+    # 所有第三方服务同时查询，采用第一个有效结果（最健康的来源在优先窗口内优先）
+    sources = _sources_by_health(IP_SOURCES)
+    print(f"正在从 {', '.join(name for name, _ in sources)} 同时获取 {domain} 的IP...")
+    ip, source_name = resolve_first(domain, sources, validate=is_ipv4)
+    if ip:
+        print(f"从 {source_name} 获取成功: {domain} -> {ip}")
+        return ip, source_name
     
     # 如果所有第三方服务都失败，尝试DNS查询作为最后手段
     # 注意：用户本地可能无法访问这些域名，DNS查询很可能失败
@@ -270,6 +343,119 @@ def get_ip_from_multiple_sources(domain: str) -> Tuple[Optional[str], str]:
     return None, "失败"
 
 
+def _lowest_latency(ips: List[str]) -> Optional[str]:
+    """并发测量候选IP的延迟（ICMP，不可用或全部超时时测TCP），返回延迟最低的IP（都不可达时返回None）"""
+    def measure(ip: str) -> Dict:
+        return measure_latency(ip, count=2, timeout=1.0, ip=ip)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(RESOLVE_WORKERS * 2, len(ips)))) as executor:
+        results = [r for r in executor.map(measure, ips) if r['success']]
+    if not results:
+        return None
+    return min(results, key=lambda r: (r['loss'], r['avg_ms']))['ip']
+
+
+def select_fastest_ip(domain: str, use_config: bool = True,
+                      progress: Optional[ProbeCallback] = None,
+                      cancel: Optional[threading.Event] = None) -> Tuple[Optional[str], str]:
+    """
+    收集所有来源的候选IP，从本机测速后选择最快的可用IP
+    
+    候选IP包括配置文件中的所有有效IP、上次选择的IP，以及各第三方服务返回的IP。
+    
+    Args:
+        domain: 域名
+        use_config: 是否把配置文件中的IP作为候选
+        progress: 每个IP测速完成时的回调 progress(域名, 测速结果)
+        cancel: 被设置时放弃仍在进行的查询和测速，返回 (None, "已取消")
+        
+    Returns:
+        (IP地址, 来源) 元组，来源为最先提供该IP的来源
+    """
+    # IP -> 来源（同一IP以最先提供的来源为准）
+    candidates: Dict[str, str] = {}
+    preferred = None
+    
+    if use_config:
+        for config_ip in get_config().get_ips(domain):
+            candidates.setdefault(config_ip, "配置文件")
+            preferred = preferred or config_ip
+    
+    cached_entry = get_cached_ip(domain)
+    if cached_entry and cached_entry[0]:
+        candidates.setdefault(cached_entry[0], cached_entry[1])
+        preferred = preferred or cached_entry[0]
+    
+    print(f"正在收集 {domain} 的候选IP...")
+    for source_name, ip in collect_all(domain, _sources_by_health(CANDIDATE_SOURCES), validate=is_ipv4,
+                                       timeout=COLLECT_TIMEOUT, cancel=cancel):
+        candidates.setdefault(ip, source_name)
+    if cancel is not None and cancel.is_set():
+        return None, "已取消"
+    
+    if not candidates:
+        ip = get_ip_from_dns(domain)
+        return (ip, "DNS查询") if ip else (None, "失败")
+    
+    print(f"正在测速 {len(candidates)} 个候选IP: {', '.join(candidates)}")
+    callback = (lambda result: progress(domain, result)) if progress else None
+    results = rank_ips(domain, list(candidates), progress=callback, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        # 测速不完整，不能据此选择
+        return None, "已取消"
+    for result in results:
+        print(f"  {format_probe(result)}")
+    
+    best = results[0]
+    if not best['ok']:
+        # 本机无法连接任何候选IP（网络受限），按原有优先级选择，
+        # 没有优先IP时选择延迟最低的（ICMP，不通时测TCP）
+        ip = preferred or _lowest_latency(list(candidates)) or next(iter(candidates))
+        print(f"所有候选IP均无法连接，使用: {ip}")
+        return ip, candidates[ip]
+    
+    if preferred and preferred != best['ip']:
+        current = next(r for r in results if r['ip'] == preferred)
+        if latency_ms(current) - latency_ms(best) <= RANK_TOLERANCE_MS:
+            best = current
+    
+    print(f"选择最快的IP: {best['ip']}（来源: {candidates[best['ip']]}）")
+    return best['ip'], candidates[best['ip']]
+
+
+def resolve_consensus(domain: str, use_config: bool = True,
+                      quorum: int = CONSENSUS_QUORUM) -> Dict:
+    """
+    共识模式：同时查询所有来源，按/24网段投票选出多数来源认可的IP
+    
+    配置文件中的IP作为一票参与投票；没有达成共识时退回最先返回的有效结果。
+    
+    Args:
+        domain: 域名
+        use_config: 是否让配置文件中的IP参与投票
+        quorum: 达成共识所需的最少票数
+        
+    Returns:
+        {'ip', 'confidence', 'sources', 'network', 'quorum'}，获取失败时ip为None
+    """
+    trusted = []
+    if use_config:
+        trusted = get_config().get_ips(domain)
+    
+    print(f"正在从所有来源获取 {domain} 的IP（共识模式）...")
+    answers = collect_all(domain, _sources_by_health(CANDIDATE_SOURCES), validate=is_ipv4,
+                          timeout=COLLECT_TIMEOUT)
+    for source_name, ip in answers:
+        print(f"  {source_name}: {ip}")
+    
+    result = find_consensus(answers, trusted=trusted, quorum=quorum)
+    if result['ip'] and result['quorum']:
+        print(f"达成共识: {result['ip']}（{result['network']}，置信度 {result['confidence']:.0%}）")
+    elif result['ip']:
+        print(f"未达成共识，使用最先返回的结果: {result['ip']}")
+    return result
+
+
 def get_domain_ip(domain: str, use_config: bool = True) -> Optional[str]:
     """
     获取域名对应的IP地址（向后兼容版本，只返回IP）
@@ -285,29 +471,78 @@ def get_domain_ip(domain: str, use_config: bool = True) -> Optional[str]:
     return ip
 
 
-def get_domain_ip_with_source(domain: str, use_config: bool = True) -> Tuple[Optional[str], str]:
+def _resolve_and_cache(domain: str) -> Tuple[Optional[str], str]:
+    """从第三方服务获取IP并写入缓存（失败也缓存，有效期较短）"""
+    ip, source = get_ip_from_multiple_sources(domain)
+    store_ip(domain, ip, source)
+    return ip, source
+
+
+def _cache_usable(domain: str, cached_entry: Tuple[Optional[str], str, bool],
+                  use_config: bool) -> bool:
+    """来自配置文件的缓存结果只在仍使用配置、且该IP仍在配置中时有效"""
+    ip, source, _ = cached_entry
+    if source != "配置文件":
+        return True
+    return use_config and ip in get_config().get_ips(domain)
+
+
+def get_domain_ip_with_source(domain: str, use_config: bool = True,
+                              use_cache: bool = True, rank: bool = False,
+                              progress: Optional[ProbeCallback] = None,
+                              cancel: Optional[threading.Event] = None) -> Tuple[Optional[str], str]:
     """
     获取域名对应的IP地址和来源
     
     Args:
         domain: 域名
         use_config: 是否优先使用配置文件中的IP
+        use_cache: 是否使用解析缓存（不使用时仍会把新结果写入缓存）
+        rank: 是否收集所有候选IP并从本机测速选择最快的（较慢，结果写入缓存，有效期内直接使用）
+        progress: 测速时每个IP完成后的回调 progress(域名, 测速结果)
+        cancel: 测速选择时的取消事件，被设置后尽快返回 (None, "失败")，结果不写入缓存
         
     Returns:
         (IP地址, 来源) 元组，如果获取失败返回 (None, "失败")
-        来源可能的值: "配置文件", "17ce.com", "ip-api.com", "ipapi.co", "DNS查询", "失败"
+        来源可能的值: "配置文件", "17ce.com", "ip-api.com", "ipapi.co", "公共DNS", "DNS查询", "失败"
         
     注意: 优先使用第三方服务，因为用户本地可能无法访问这些域名
     """
+    if rank:
+        cached_entry = get_cached_ip(domain, ranked=True) if use_cache else None
+        if cached_entry and cached_entry[0] and cached_entry[2] and \
+                _cache_usable(domain, cached_entry, use_config):
+            print(f"使用缓存的测速结果: {domain} -> {cached_entry[0]}（来源: {cached_entry[1]}）")
+            return cached_entry[0], cached_entry[1]
+        ip, source = select_fastest_ip(domain, use_config=use_config, progress=progress,
+                                       cancel=cancel)
+        if ip:
+            store_ip(domain, ip, source, ranked=True)
+        return (ip, source) if ip else (None, "失败")
+    
     # 优先使用配置文件中的IP
     if use_config:
-        config = load_config()
-        if domain in config and config[domain]:
-            print(f"使用配置文件中的IP: {config[domain]}")
-            return config[domain], "配置文件"
+        config_ip = get_config().get_ip(domain)
+        if config_ip:
+            print(f"使用配置文件中的IP: {config_ip}")
+            return config_ip, "配置文件"
     
-    # 从多个来源获取IP（按优先级顺序）
-    ip, source = get_ip_from_multiple_sources(domain)
+    # 其次使用缓存：过期的结果先用着，同时在后台重新获取
+    if use_cache:
+        cached_entry = get_cached_ip(domain)
+        if cached_entry is not None and _cache_usable(domain, cached_entry, use_config):
+            ip, source, fresh = cached_entry
+            if not fresh:
+                # 后台刷新由refresh_in_background写入缓存，这里只传入获取函数
+                refresh_in_background(domain, get_ip_from_multiple_sources)
+            if ip:
+                print(f"使用缓存的IP: {domain} -> {ip}（来源: {source}）")
+                return ip, source
+            print(f"{domain} 最近获取IP失败，稍后再试")
+            return None, "失败"
+    
+    # 从多个来源获取IP（并发查询）
+    ip, source = _resolve_and_cache(domain)
     
     if ip:
         return ip, source
@@ -316,6 +551,45 @@ def get_domain_ip_with_source(domain: str, use_config: bool = True) -> Tuple[Opt
         return None, "失败"
 
 
+def resolve_many(domains: List[str], use_config: bool = True,
+                 max_workers: int = RESOLVE_WORKERS, use_cache: bool = True,
+                 rank: bool = False, progress: Optional[ProbeCallback] = None,
+                 cancel: Optional[threading.Event] = None) -> Dict[str, Tuple[Optional[str], str]]:
+    """
+    并发获取多个域名的IP地址
+    
+    Args:
+        domains: 域名列表（重复的域名只查询一次）
+        use_config: 是否优先使用配置文件中的IP
+        max_workers: 同时查询的域名数量上限
+        use_cache: 是否使用解析缓存
+        rank: 是否测速选择最快的候选IP
+        progress: 测速时每个IP完成后的回调 progress(域名, 测速结果)（在后台线程中调用）
+        cancel: 测速选择时的取消事件，被设置后尚未完成的域名返回 (None, "失败")
+        
+    Returns:
+        {域名: (IP地址, 来源)}，获取失败的域名为 (None, "失败")
+    """
+    unique = list(dict.fromkeys(domains))
+    if not unique:
+        return {}
+    
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as executor:
+        futures = {
+            domain: executor.submit(get_domain_ip_with_source, domain, use_config,
+                                     use_cache, rank, progress, cancel)
+            for domain in unique
+        }
+        for domain, future in futures.items():
+            try:
+                results[domain] = future.result()
+            except Exception as e:
+                print(f"获取 {domain} 的IP失败: {e}")
+                results[domain] = (None, "失败")
+    return results
+
+
 def main():
     """命令行入口"""
     import argparse
@@ -324,10 +598,26 @@ def main():
     parser.add_argument('domain', help='要查询的域名')
     parser.add_argument('--no-config', action='store_true', 
                        help='不使用配置文件中的IP')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='不使用缓存，重新获取IP')
+    parser.add_argument('--consensus', action='store_true',
+                       help='共识模式：查询所有来源，按网段投票选出多数来源认可的IP')
     
     args = parser.parse_args()
     
-    ip, source = get_domain_ip_with_source(args.domain, use_config=not args.no_config)
+    if args.consensus:
+        result = resolve_consensus(args.domain, use_config=not args.no_config)
+        if not result['ip']:
+            print(f"\n无法获取 {args.domain} 的IP地址")
+            sys.exit(1)
+        print(f"\n域名: {args.domain}")
+        print(f"IP地址: {result['ip']}")
+        print(f"置信度: {result['confidence']:.0%}{'' if result['quorum'] else '（未达成共识）'}")
+        print(f"支持来源: {', '.join(result['sources'])}")
+        sys.exit(0)
+    
+    ip, source = get_domain_ip_with_source(args.domain, use_config=not args.no_config,
+                                           use_cache=not args.no_cache)
     
     if ip:
         print(f"\n域名: {args.domain}")
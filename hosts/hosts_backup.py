@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hosts备份存储
+快照按内容的SHA-256保存为gzip压缩文件，内容相同只保存一份，
+与上一次快照相同时直接跳过；按数量和时间自动清理旧快照。
+备份保存在应用数据目录中，不需要管理员权限。
+
+用法:
+    python hosts/hosts_backup.py list
+    python hosts/hosts_backup.py diff <备份ID>
+    python hosts/hosts_backup.py restore <备份ID>
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import hashlib
+import difflib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.check_hosts import get_hosts_path
+from hosts.hosts_cache import invalidate_hosts_cache
+from utils.app_dirs import get_app_data_dir
+from utils.elevate_permission import check_permission, atomic_write_file, elevate_write_file
+from utils.file_lock import file_lock
+
+# 保留策略：最多保留的快照数量、最长保留天数
+MAX_BACKUPS = 20
+MAX_AGE_DAYS = 30
+
+# 备份ID长度（内容哈希的前缀）
+ID_LENGTH = 12
+
+
+def get_backup_dir() -> str:
+    """备份存储目录"""
+    return get_app_data_dir('hosts_backups')
+
+
+def _object_path(digest: str) -> str:
+    return os.path.join(get_backup_dir(), f"{digest}.gz")
+
+
+def _index_path() -> str:
+    return os.path.join(get_backup_dir(), 'index.json')
+
+
+def _load_index() -> List[Dict]:
+    """读取快照索引（按时间从旧到新）"""
+    try:
+        with open(_index_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _save_index(index: List[Dict]):
+    atomic_write_file(_index_path(), json.dumps(index, ensure_ascii=False, indent=1))
+
+
+def _write_object(path: str, data: bytes):
+    """写入压缩内容（先写临时文件再rename，不会留下不完整的快照）"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _prune(index: List[Dict], max_backups: int, max_age_days: float) -> List[Dict]:
+    """按数量和时间清理快照，并删除不再被引用的内容文件"""
+    cutoff = time.time() - max_age_days * 86400
+    kept = [entry for entry in index if entry['time'] >= cutoff]
+    # 至少保留最新的一份，避免长时间未修改后没有可用备份
+    if not kept and index:
+        kept = index[-1:]
+    kept = kept[-max_backups:]
+
+    referenced = {entry['hash'] for entry in kept}
+    for entry in index:
+        digest = entry['hash']
+        if digest not in referenced:
+            referenced.add(digest)  # 同一内容只删除一次
+            try:
+                os.unlink(_object_path(digest))
+            except OSError:
+                pass
+    return kept
+
+
+def backup_hosts(hosts_path: Optional[str] = None, note: str = '',
+                 max_backups: int = MAX_BACKUPS,
+                 max_age_days: float = MAX_AGE_DAYS) -> Optional[str]:
+    """
+    保存hosts文件快照
+
+    Args:
+        hosts_path: hosts文件路径
+        note: 备注（如本次修改的说明）
+        max_backups: 最多保留的快照数量
+        max_age_days: 最长保留天数
+
+    Returns:
+        备份ID；与上一次快照内容相同时返回上一次的ID；读取失败返回None
+    """
+    hosts_path = hosts_path or get_hosts_path()
+    try:
+        with open(hosts_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        print(f"警告: 无法读取hosts文件进行备份: {e}")
+        return None
+
+    digest = hashlib.sha256(data).hexdigest()
+    # GUI和命令行可能同时备份：索引的读-改-写、快照写入和清理都在跨进程文件锁内完成
+    with file_lock(_index_path()):
+        index = _load_index()
+        if index and index[-1]['hash'] == digest and index[-1]['path'] == hosts_path:
+            return digest[:ID_LENGTH]
+
+        object_path = _object_path(digest)
+        if not os.path.exists(object_path):
+            # mtime固定为0，相同内容压缩结果也相同
+            _write_object(object_path, gzip.compress(data, mtime=0))
+
+        index.append({
+            'hash': digest,
+            'time': time.time(),
+            'size': len(data),
+            'path': hosts_path,
+            'note': note,
+        })
+        _save_index(_prune(index, max_backups, max_age_days))
+
+    return digest[:ID_LENGTH]
+
+
+def list_backups() -> List[Dict]:
+    """
+    列出快照（最新的在前）
+
+    Returns:
+        [{'id', 'hash', 'time', 'size', 'path', 'note'}, ...]
+    """
+    # 索引以临时文件+rename方式整体替换，读取时不需要加锁
+    index = _load_index()
+    return [dict(entry, id=entry['hash'][:ID_LENGTH]) for entry in reversed(index)]
+
+
+def _find_backup(backup_id: str) -> Optional[Dict]:
+    """按ID（哈希前缀）查找快照，取最新的一条"""
+    for entry in list_backups():
+        if entry['hash'].startswith(backup_id):
+            return entry
+    return None
+
+
+def read_backup(backup_id: str) -> Optional[str]:
+    """读取快照内容，找不到时返回None"""
+    entry = _find_backup(backup_id)
+    if not entry:
+        return None
+    try:
+        with open(_object_path(entry['hash']), 'rb') as f:
+            return gzip.decompress(f.read()).decode('utf-8', errors='ignore')
+    except OSError:
+        return None
+
+
+def diff_backup(backup_id: str, hosts_path: Optional[str] = None) -> Optional[str]:
+    """
+    比较快照与当前hosts文件
+
+    Returns:
+        unified diff文本（无差异时为空字符串），找不到快照返回None
+    """
+    hosts_path = hosts_path or get_hosts_path()
+    old = read_backup(backup_id)
+    if old is None:
+        return None
+    try:
+        with open(hosts_path, 'r', encoding='utf-8', errors='ignore') as f:
+            current = f.read()
+    except OSError:
+        current = ''
+    return ''.join(difflib.unified_diff(
+        old.splitlines(keepends=True), current.splitlines(keepends=True),
+        fromfile=f"backup:{backup_id}", tofile=hosts_path
+    ))
+
+
+def restore_backup(backup_id: str, hosts_path: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    用快照恢复hosts文件（恢复前先为当前内容保存快照）
+
+    Returns:
+        (成功标志, 错误消息)
+    """
+    hosts_path = hosts_path or get_hosts_path()
+    content = read_backup(backup_id)
+    if content is None:
+        return False, f"找不到备份: {backup_id}"
+
+    backup_hosts(hosts_path, note=f"恢复备份 {backup_id} 前")
+
+    try:
+        if check_permission():
+            try:
+                atomic_write_file(hosts_path, content)
+                return True, ""
+            except PermissionError:
+                pass
+        return elevate_write_file(hosts_path, content)
+    finally:
+        invalidate_hosts_cache(hosts_path)
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='管理hosts文件备份')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('list', help='列出备份')
+    diff_parser = subparsers.add_parser('diff', help='比较备份与当前hosts文件')
+    diff_parser.add_argument('backup_id', help='备份ID')
+    restore_parser = subparsers.add_parser('restore', help='恢复备份')
+    restore_parser.add_argument('backup_id', help='备份ID')
+
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        diff = diff_backup(args.backup_id)
+        if diff is None:
+            print(f"找不到备份: {args.backup_id}")
+            sys.exit(1)
+        print(diff or "备份与当前hosts文件相同")
+    elif args.command == 'restore':
+        success, error_msg = restore_backup(args.backup_id)
+        if success:
+            print(f"✓ 已恢复备份: {args.backup_id}")
+        else:
+            print(f"✗ 恢复失败: {error_msg}")
+            sys.exit(1)
+    else:
+        backups = list_backups()
+        if not backups:
+            print("暂无备份")
+            return
+        print(f"备份目录: {get_backup_dir()}")
+        for entry in backups:
+            when = datetime.fromtimestamp(entry['time']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{entry['id']}  {when}  {entry['size']:>10} 字节  {entry['note']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hosts文件解析缓存
+以 (路径, st_mtime_ns, st_size, st_ino) 为键，文件未变化时直接返回上次的解析结果
+GUI和命令行共用，本工具写入hosts后主动失效
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_lock = threading.Lock()
+# (路径, 类型) -> (文件签名, 解析结果)
+_entries: Dict[Tuple[str, str], Tuple[tuple, Any]] = {}
+_stats = {'hits': 0, 'misses': 0}
+
+
+def file_signature(path: str) -> Optional[tuple]:
+    """获取文件签名，文件不存在或无法访问时返回None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def cached(path: str, kind: str, loader: Callable[[], Any]) -> Any:
+    """
+    获取缓存的解析结果，文件变化时调用loader重新解析
+
+    Args:
+        path: 文件路径
+        kind: 结果类型（同一文件可缓存多种解析结果）
+        loader: 解析函数，抛出异常时不缓存
+
+    Returns:
+        解析结果（调用方不应修改返回的对象）
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return loader()
+
+    with _lock:
+        entry = _entries.get((path, kind))
+        if entry and entry[0] == signature:
+            _stats['hits'] += 1
+            return entry[1]
+        _stats['misses'] += 1
+
+    # 签名在读取前获取：读取期间文件若被修改，下次签名不一致会重新解析
+    value = loader()
+    with _lock:
+        _entries[(path, kind)] = (signature, value)
+    return value
+
+
+def invalidate_hosts_cache(path: Optional[str] = None):
+    """使缓存失效（path为None时清空全部）"""
+    with _lock:
+        if path is None:
+            _entries.clear()
+        else:
+            for key in [k for k in _entries if k[0] == path]:
+                del _entries[key]
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """返回缓存命中/未命中次数"""
+    with _lock:
+        return {
+            'hits': _stats['hits'],
+            'misses': _stats['misses'],
+            'entries': len(_entries),
+        }
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hosts文件内存模型
+本工具的所有绑定都放在一个标记区域内：
+
+    # >>> qiantu-user-tools
+    47.104.5.133	dl.58pic.com
+    # <<< qiantu-user-tools
+
+区域通过一次列表查找定位，修改只重建这个区域，区域外的用户内容原样保留
+（包括每行原有的换行符，管理区域使用文件原有的换行风格）。
+区域外旧版本写入的千图绑定通过子串预过滤建立索引，绑定时自动迁移进区域。
+"""
+
+import os
+import sys
+from typing import List, Optional, Dict, Tuple, Iterator
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.check_hosts import (get_hosts_path, read_hosts, parse_hosts_entry,
+                               is_qiantu_domain, QIANTU_NEEDLES)
+from hosts.hosts_cache import cached
+
+# 管理区域的起止标记
+BLOCK_BEGIN = '# >>> qiantu-user-tools'
+BLOCK_END = '# <<< qiantu-user-tools'
+BLOCK_NOTE = '# 此区域由千图网问题解决工具自动维护，请勿手动修改'
+
+# 区域外千图绑定的预过滤关键字
+_TEXT_NEEDLES = [needle.decode('ascii') for needle in QIANTU_NEEDLES]
+
+
+def _read_raw_lines(path: str) -> List[str]:
+    """读取hosts文件行，保留每行原有的换行符（出错时抛出异常）"""
+    with open(path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+        return f.readlines()
+
+
+def _find_line(lines: List[str], text: str, start: int = 0) -> Optional[int]:
+    """查找内容为text的行（列表查找在C层完成，只扫描一次）"""
+    for candidate in (text + '\n', text + '\r\n', text):
+        try:
+            return lines.index(candidate, start)
+        except ValueError:
+            continue
+    return None
+
+
+class HostsFile:
+    """
+    Hosts文件模型
+
+    - 管理区域内的条目保存在有序字典中，增删改只涉及区域大小
+    - 区域外的行原样保存，删除旧绑定时用None占位
+    - 区域外的千图绑定预先建立索引，其他域名的完整索引按需建立
+    """
+
+    def __init__(self, lines: List[str], path: Optional[str] = None):
+        self.path = path or get_hosts_path()
+        lines = list(lines)
+        # 文件的换行风格（按第一行判断），新写入的行使用相同的换行符
+        self.newline = '\r\n' if lines and lines[0].endswith('\r\n') else '\n'
+
+        # 管理区域内的条目: 域名 -> (IP, 行号)，新增条目行号为None
+        self._block: Dict[str, Tuple[str, Optional[int]]] = {}
+        self._block_pos: Optional[int] = None
+        self._block_len = 0
+
+        begin = _find_line(lines, BLOCK_BEGIN)
+        if begin is not None:
+            end = _find_line(lines, BLOCK_END, begin + 1)
+            if end is None:
+                # 结束标记丢失时只移除起始标记，其余行按普通内容处理
+                end = begin
+            for pos in range(begin + 1, end):
+                ip, domain = parse_hosts_entry(lines[pos])
+                if domain and domain not in self._block:
+                    self._block[domain] = (ip, pos + 1)
+            self._block_pos = begin
+            self._block_len = end - begin + 1
+            lines = lines[:begin] + lines[end + 1:]
+
+        # 区域外的行（删除的行用None占位）
+        self._lines: List[Optional[str]] = lines
+
+        # 区域外的千图绑定索引: 域名 -> [(位置, IP), ...]
+        self._qiantu_index: Dict[str, List[Tuple[int, str]]] = {}
+        for pos, line in enumerate(lines):
+            for needle in _TEXT_NEEDLES:
+                if needle in line:
+                    ip, domain = parse_hosts_entry(line)
+                    if domain and is_qiantu_domain(domain):
+                        self._qiantu_index.setdefault(domain, []).append((pos, ip))
+                    break
+
+        # 区域外所有绑定的完整索引（按需建立）
+        self._full_index: Optional[Dict[str, List[Tuple[int, str]]]] = None
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'HostsFile':
+        """
+        读取并解析hosts文件
+
+        文件未变化时直接复制缓存中的解析结果，不再逐行解析。
+        """
+        path = path or get_hosts_path()
+        try:
+            model = cached(path, 'model', lambda: cls(_read_raw_lines(path), path=path))
+        except Exception:
+            # 读取失败不缓存，由read_hosts打印警告并返回空内容
+            return cls(read_hosts(hosts_path=path), path=path)
+        return model.copy()
+
+    def copy(self) -> 'HostsFile':
+        """复制模型（不重新解析）"""
+        clone = type(self).__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone._lines = list(self._lines)
+        clone._block = dict(self._block)
+        # 索引中的列表只会被整体替换、不会原地修改，浅复制即可
+        clone._qiantu_index = dict(self._qiantu_index)
+        if self._full_index is not None:
+            clone._full_index = dict(self._full_index)
+        return clone
+
+    def _outside_index(self, domain: str) -> Dict[str, List[Tuple[int, str]]]:
+        """返回能查到该域名区域外绑定的索引（千图域名不需要完整索引）"""
+        if domain and is_qiantu_domain(domain):
+            return self._qiantu_index
+        if self._full_index is None:
+            self._full_index = {}
+            for pos, line in enumerate(self._lines):
+                if line is None:
+                    continue
+                ip, parsed = parse_hosts_entry(line)
+                if parsed:
+                    self._full_index.setdefault(parsed, []).append((pos, ip))
+        return self._full_index
+
+    def _line_num(self, pos: int) -> int:
+        """区域外行的位置 -> 原文件中的行号"""
+        if self._block_pos is not None and pos >= self._block_pos:
+            return pos + self._block_len + 1
+        return pos + 1
+
+    def __contains__(self, domain: str) -> bool:
+        return domain in self._block or domain in self._outside_index(domain)
+
+    def managed(self) -> Dict[str, str]:
+        """返回管理区域内的绑定 {域名: IP}"""
+        return {domain: ip for domain, (ip, _) in self._block.items()}
+
+    def domains(self, qiantu_only: bool = False) -> List[str]:
+        """
+        返回已绑定域名（管理区域在前，其余按首次出现的顺序）
+
+        Args:
+            qiantu_only: 只返回千图相关域名（不需要建立完整索引）
+        """
+        if qiantu_only:
+            result = [d for d in self._block if is_qiantu_domain(d)]
+            outside = self._qiantu_index
+        else:
+            result = list(self._block)
+            outside = self._outside_index('')
+        result += [d for d in outside if d not in self._block]
+        return result
+
+    def lookup(self, domain: str) -> Optional[Tuple[str, Optional[int]]]:
+        """
+        查找域名的绑定
+
+        Returns:
+            (ip, 行号) 元组，行号从1开始（尚未写入的新条目为None）；未绑定返回None
+        """
+        if domain in self._block:
+            return self._block[domain]
+        positions = self._outside_index(domain).get(domain)
+        if not positions:
+            return None
+        pos, ip = positions[0]
+        return ip, self._line_num(pos)
+
+    def get_ip(self, domain: str) -> Optional[str]:
+        """获取域名绑定的IP"""
+        found = self.lookup(domain)
+        return found[0] if found else None
+
+    def bindings(self, domain: str) -> List[str]:
+        """域名的所有绑定IP（管理区域内的在前，区域外的按行顺序）"""
+        ips = [self._block[domain][0]] if domain in self._block else []
+        return ips + [ip for _, ip in self._outside_index(domain).get(domain, [])]
+
+    def entries(self) -> Iterator[Tuple[str, str, Optional[int], str]]:
+        """
+        遍历每个域名的首个绑定
+
+        Yields:
+            (domain, ip, 行号, 原始行)
+        """
+        for domain, (ip, line_num) in self._block.items():
+            yield domain, ip, line_num, f"{ip}\t{domain}"
+        for domain, positions in self._outside_index('').items():
+            if domain in self._block:
+                continue
+            pos, ip = positions[0]
+            yield domain, ip, self._line_num(pos), self._lines[pos].strip()
+
+    def upsert(self, domain: str, ip: str) -> bool:
+        """
+        添加或更新域名绑定（写入管理区域）
+
+        区域外的同名旧绑定会被移除，即迁移到管理区域内；
+        但区域外只有一条且IP相同的绑定时保持原样（已是目标状态，不必为迁移而写入文件）。
+
+        Returns:
+            是否有实际修改
+        """
+        if domain not in self._block:
+            positions = self._outside_index(domain).get(domain)
+            if positions and len(positions) == 1 and positions[0][1] == ip:
+                return False
+        changed = bool(self._remove_outside(domain))
+        current = self._block.get(domain)
+        if current is None or current[0] != ip:
+            self._block[domain] = (ip, None)
+            changed = True
+        return changed
+
+    def remove(self, domain: str) -> List[Tuple[str, str]]:
+        """
+        移除域名的所有绑定（管理区域内外）
+
+        Returns:
+            被移除的 (ip, domain) 列表
+        """
+        removed = []
+        if domain in self._block:
+            ip, _ = self._block.pop(domain)
+            removed.append((ip, domain))
+        removed += self._remove_outside(domain)
+        return removed
+
+    def clear_managed(self, qiantu_only: bool = True) -> List[Tuple[str, str]]:
+        """
+        清空管理区域（耗时只与区域大小有关）
+
+        Args:
+            qiantu_only: 只移除千图相关域名
+
+        Returns:
+            被移除的 (ip, domain) 列表
+        """
+        removed = [(ip, domain) for domain, (ip, _) in self._block.items()
+                   if not qiantu_only or is_qiantu_domain(domain)]
+        for _, domain in removed:
+            del self._block[domain]
+        return removed
+
+    def _remove_outside(self, domain: str) -> List[Tuple[str, str]]:
+        """移除管理区域外的绑定行"""
+        positions = self._outside_index(domain).get(domain)
+        if not positions:
+            return []
+        # 两个索引可能都包含该域名，保持一致
+        self._qiantu_index.pop(domain, None)
+        if self._full_index is not None:
+            self._full_index.pop(domain, None)
+        for pos, _ in positions:
+            self._lines[pos] = None
+        return [(ip, domain) for _, ip in positions]
+
+    def _render_block(self) -> List[str]:
+        """生成管理区域的行（没有条目时整个区域省略）"""
+        if not self._block:
+            return []
+        nl = self.newline
+        lines = [BLOCK_BEGIN + nl, BLOCK_NOTE + nl]
+        lines += [f"{ip}\t{domain}{nl}" for domain, (ip, _) in self._block.items()]
+        lines.append(BLOCK_END + nl)
+        return lines
+
+    def to_lines(self) -> List[str]:
+        """返回当前内容的行列表（管理区域放回原位置，没有时追加到末尾）"""
+        split = len(self._lines) if self._block_pos is None else self._block_pos
+        head = [line for line in self._lines[:split] if line is not None]
+        tail = [line for line in self._lines[split:] if line is not None]
+        block = self._render_block()
+        # 文件末尾没有换行时补上，避免管理区域与最后一行粘连
+        if block and head and not head[-1].endswith('\n'):
+            head[-1] += self.newline
+        return head + block + tail
+
+    def render(self) -> str:
+        """返回当前内容（用于写入文件）"""
+        return ''.join(self.to_lines())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hosts批量修改事务
+收集任意数量的绑定/解绑操作，应用到同一个内存模型，
+提交时只原子写入一次（需要提权时只请求一次权限）
+"""
+
+import os
+import sys
+from typing import List, Optional, Tuple
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.check_hosts import get_hosts_path, is_qiantu_domain
+from hosts.hosts_file import HostsFile
+from hosts.hosts_cache import invalidate_hosts_cache
+from hosts.hosts_backup import backup_hosts
+from hosts.domain_matcher import DomainMatcher, parent_domains
+from utils.elevate_permission import check_permission, atomic_write_file, elevate_write_file
+
+# 没有实际修改时的提示
+ALREADY_APPLIED_MESSAGE = "hosts文件已是目标状态，无需修改"
+
+
+class HostsTransaction:
+    """
+    Hosts批量修改事务
+
+    用法:
+        txn = HostsTransaction()
+        txn.bind('dl.58pic.com', '47.104.5.133')
+        txn.unbind('preview.qiantucdn.com')
+        success, error_msg = txn.commit()
+    """
+
+    def __init__(self, hosts_path: Optional[str] = None):
+        self.hosts_path = hosts_path or get_hosts_path()
+        self.hosts = HostsFile.load(self.hosts_path)
+        # 加载时的模型，用于判断修改是否相互抵消
+        self._base = self.hosts.copy()
+        # 已应用的修改: (操作, 域名, IP)
+        self.changes: List[Tuple[str, str, Optional[str]]] = []
+
+    def bind(self, domain: str, ip: str) -> str:
+        """
+        绑定域名
+
+        Returns:
+            'added' 新增, 'updated' 更新, '' 已存在相同绑定
+        """
+        existed = domain in self.hosts
+        if not self.hosts.upsert(domain, ip):
+            return ''
+        self.changes.append(('bind', domain, ip))
+        return 'updated' if existed else 'added'
+
+    def unbind(self, domain: str) -> List[Tuple[str, str]]:
+        """
+        解绑域名（包括其子域名和父域名的绑定）
+
+        Returns:
+            被移除的 (ip, domain) 列表
+        """
+        # 匹配: 域名本身、其子域名（字典树）以及其父域名（索引直接查找）
+        # 千图域名只需查找管理区域和区域外的千图绑定，不必解析整个文件
+        qiantu_only = is_qiantu_domain(domain)
+        target = DomainMatcher([domain])
+        matched = [d for d in self.hosts.domains(qiantu_only=qiantu_only) if d in target]
+        matched += [d for d in parent_domains(domain)
+                    if (not qiantu_only or is_qiantu_domain(d)) and d in self.hosts]
+        return self._remove(matched)
+
+    def unbind_all_qiantu(self) -> List[Tuple[str, str]]:
+        """
+        解绑所有千图相关域名
+
+        先清空管理区域（只涉及区域大小），再移除旧版本写在区域外的千图绑定。
+
+        Returns:
+            被移除的 (ip, domain) 列表
+        """
+        removed = self.hosts.clear_managed()
+        for ip, domain in removed:
+            self.changes.append(('unbind', domain, ip))
+        return removed + self._remove(self.hosts.domains(qiantu_only=True))
+
+    def _remove(self, domains: List[str]) -> List[Tuple[str, str]]:
+        removed = []
+        for domain in domains:
+            for ip, _ in self.hosts.remove(domain):
+                removed.append((ip, domain))
+                self.changes.append(('unbind', domain, ip))
+        return removed
+
+    @property
+    def is_noop(self) -> bool:
+        """
+        没有实际修改，提交时不会备份、写入或请求权限
+
+        包括所有绑定/解绑都已生效，以及修改相互抵消的情况
+        （如绑定新域名后又解绑、修改IP后又改回）：涉及的每个域名的绑定都与加载时相同。
+        只是把区域外的同一绑定移进管理区域不算修改（与upsert一致）。
+        """
+        if not self.changes:
+            return True
+        touched = {domain for _, domain, _ in self.changes}
+        return all(self.hosts.bindings(domain) == self._base.bindings(domain) for domain in touched)
+
+    def _describe_changes(self) -> str:
+        """修改摘要（作为备份备注）"""
+        counts = {}
+        for action, _, _ in self.changes:
+            counts[action] = counts.get(action, 0) + 1
+        names = {'bind': '绑定', 'unbind': '解绑'}
+        return ', '.join(f"{names.get(action, action)} {count} 个域名" for action, count in counts.items())
+
+    def commit(self) -> Tuple[bool, str]:
+        """
+        提交修改：一次原子写入
+
+        写入前在用户目录保存一份快照（内容相同时跳过），
+        内容先写入同目录临时文件并同步，再rename替换hosts文件，中断时hosts文件保持旧内容。
+        没有权限时通过权限提升完成同样的步骤，只提示一次密码。
+
+        Returns:
+            (成功标志, 错误消息)
+        """
+        if self.is_noop:
+            return True, ""
+
+        hosts_path = self.hosts_path
+        file_content = self.hosts.render()
+
+        # 快照保存在用户目录（去重、压缩），不需要权限，失败也不影响写入
+        try:
+            backup_hosts(hosts_path, note=self._describe_changes())
+        except Exception as e:
+            print(f"警告: 备份hosts文件失败: {e}")
+
+        if check_permission():
+            try:
+                atomic_write_file(hosts_path, file_content)
+            except PermissionError:
+                # 直接写入被拒绝，改用权限提升
+                pass
+            except Exception as e:
+                print(f"✗ 修改hosts文件失败: {e}")
+                return False, str(e)
+            else:
+                invalidate_hosts_cache(hosts_path)
+                self.changes = []
+                self._base = self.hosts.copy()
+                return True, ""
+
+        # 没有权限，使用权限提升工具（类似SwitchHosts!）
+        print(f"\n需要管理员权限来修改hosts文件，正在请求权限...")
+        success, error_msg = elevate_write_file(hosts_path, file_content)
+        invalidate_hosts_cache(hosts_path)
+        if success:
+            self.changes = []
+            self._base = self.hosts.copy()
+            return True, ""
+        return False, error_msg
+
+
+def commit_transaction(txn: HostsTransaction, summary: str) -> bool:
+    """提交事务并打印结果（命令行使用）"""
+    if txn.is_noop:
+        print(f"\n✓ {ALREADY_APPLIED_MESSAGE}")
+        return True
+    success, error_msg = txn.commit()
+    if success:
+        print(f"\n✓ 已成功更新hosts文件")
+        print(f"✓ {summary}")
+        return True
+    else:
+        print(f"\n✗ 错误: 修改hosts文件失败")
+        print(f"错误信息: {error_msg}")
+        return False
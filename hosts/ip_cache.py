@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+域名IP解析缓存（保存在用户缓存目录，GUI和命令行共用）
+
+- 新鲜的结果直接返回，不访问网络
+- 过期但不太旧的结果先返回，同时在后台重新获取
+- 获取失败也会缓存（时间较短），避免短时间内反复等待超时
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.app_dirs import get_app_cache_dir
+from utils.elevate_permission import atomic_write_file
+from utils.file_lock import file_lock
+
+# 成功结果的有效期（秒）
+POSITIVE_TTL = 6 * 3600
+# 失败结果的有效期（秒）
+NEGATIVE_TTL = 5 * 60
+# 过期结果最多继续使用多久（秒），超过后必须重新获取
+STALE_MAX_AGE = 7 * 24 * 3600
+
+# 正在后台刷新的域名
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def get_cache_path() -> str:
+    """缓存文件路径"""
+    return os.path.join(get_app_cache_dir(), 'ip_cache.json')
+
+
+def _load() -> Dict[str, Dict]:
+    try:
+        with open(get_cache_path(), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def get_cached_ip(domain: str, ranked: bool = False) -> Optional[Tuple[Optional[str], str, bool]]:
+    """
+    查询缓存
+
+    Args:
+        domain: 域名
+        ranked: 只返回测速选出的结果
+
+    Returns:
+        (IP地址, 来源, 是否新鲜)；IP为None表示最近获取失败（只在新鲜时返回）；
+        没有可用缓存返回None
+    """
+    entry = _load().get(domain)
+    if not entry or (ranked and not entry.get('ranked')):
+        return None
+
+    age = time.time() - entry.get('time', 0)
+    ip = entry.get('ip')
+    if ip and age >= STALE_MAX_AGE:
+        return None
+    if 0 <= age < entry.get('ttl', 0):
+        return ip, entry.get('source', ''), True
+    if ip:
+        return ip, entry.get('source', ''), False
+    return None
+
+
+def store_ip(domain: str, ip: Optional[str], source: str, ttl: Optional[float] = None,
+             ranked: bool = False):
+    """
+    保存解析结果（ip为None时保存为失败结果；ranked表示是测速选出的结果）
+
+    - 已有成功结果时不被失败结果覆盖：保留原IP，NEGATIVE_TTL秒内不再重试
+    - 重新获取到与测速结果相同的IP时保留测速标记
+
+    读-改-写在文件锁内完成，写入使用临时文件+rename，其他进程不会读到写了一半的文件。
+    """
+    if ttl is None:
+        ttl = POSITIVE_TTL if ip else NEGATIVE_TTL
+    path = get_cache_path()
+    try:
+        with file_lock(path):
+            data = _load()
+            entry = data.get(domain) or {}
+            now = time.time()
+            if not ip and entry.get('ip'):
+                # 保持原来的保存时间（过期结果的最长使用期限照常计算），只延长有效期
+                entry['ttl'] = max(0, now - entry.get('time', now)) + NEGATIVE_TTL
+            else:
+                ranked = ranked or bool(ip and entry.get('ranked') and entry.get('ip') == ip)
+                data[domain] = {'ip': ip, 'source': source, 'time': now, 'ttl': ttl,
+                                'ranked': ranked}
+            atomic_write_file(path, json.dumps(data, ensure_ascii=False, indent=1))
+    except OSError as e:
+        print(f"警告: 保存IP缓存失败: {e}")
+
+
+def refresh_in_background(domain: str, resolver: Callable[[str], Tuple[Optional[str], str]]):
+    """
+    在后台重新获取域名IP并更新缓存（同一域名同时只刷新一次）
+
+    Args:
+        domain: 域名
+        resolver: 获取函数，返回 (IP, 来源)（只负责获取，结果由本函数写入缓存）
+    """
+    with _refreshing_lock:
+        if domain in _refreshing:
+            return
+        _refreshing.add(domain)
+
+    def run():
+        try:
+            ip, source = resolver(domain)
+            store_ip(domain, ip, source)
+        except Exception as e:
+            print(f"后台刷新 {domain} 的IP失败: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(domain)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def clear_ip_cache(domain: Optional[str] = None):
+    """清除缓存（domain为None时清除全部）"""
+    path = get_cache_path()
+    with file_lock(path):
+        data = {} if domain is None else _load()
+        data.pop(domain, None)
+        atomic_write_file(path, json.dumps(data, ensure_ascii=False, indent=1))
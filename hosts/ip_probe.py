@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+候选IP测速
+从本机并发测量每个候选IP的TCP连接时间（443端口，失败时80端口）
+和TLS握手时间（使用域名作为SNI并校验证书），选出最快的可用IP
+"""
+
+import ssl
+import time
+import queue
+import socket
+import threading
+from typing import Callable, Dict, List, Optional
+
+# 单个IP的超时时间（秒）
+PROBE_TIMEOUT = 3.0
+
+# 同时测速的IP数量上限
+PROBE_WORKERS = 8
+
+# 等待测速结果时检查取消请求的间隔（秒）
+CANCEL_POLL = 0.1
+
+
+def probe_ip(ip: str, domain: str, timeout: float = PROBE_TIMEOUT) -> Dict:
+    """
+    测量单个IP的连接延迟
+
+    Returns:
+        {'ip', 'port', 'tcp_ms', 'tls_ms', 'ok', 'error'}
+        ok为True表示可用：443端口TLS握手成功且证书与域名匹配，或443不通但80端口可连接
+    """
+    result = {'ip': ip, 'port': None, 'tcp_ms': None, 'tls_ms': None, 'ok': False, 'error': ''}
+
+    try:
+        start = time.perf_counter()
+        sock = socket.create_connection((ip, 443), timeout=timeout)
+    except OSError as e:
+        # HTTPS不通时退回HTTP端口（只测TCP连接）
+        try:
+            start = time.perf_counter()
+            with socket.create_connection((ip, 80), timeout=timeout):
+                result.update(port=80, tcp_ms=(time.perf_counter() - start) * 1000, ok=True)
+        except OSError:
+            result['error'] = f"连接失败: {e}"
+        return result
+
+    result['port'] = 443
+    result['tcp_ms'] = (time.perf_counter() - start) * 1000
+    try:
+        context = ssl.create_default_context()
+        start = time.perf_counter()
+        with context.wrap_socket(sock, server_hostname=domain) as tls:
+            result['tls_ms'] = (time.perf_counter() - start) * 1000
+            result['ok'] = True
+    except ssl.SSLCertVerificationError as e:
+        result['error'] = f"证书与域名不匹配: {e.verify_message}"
+    except (OSError, ssl.SSLError) as e:
+        result['error'] = f"TLS握手失败: {e}"
+    finally:
+        sock.close()
+    return result
+
+
+def latency_ms(result: Dict) -> float:
+    """测速结果的总延迟（TCP + TLS），不可用时为无穷大"""
+    if not result.get('ok'):
+        return float('inf')
+    return (result.get('tcp_ms') or 0) + (result.get('tls_ms') or 0)
+
+
+def format_latency(result: Dict) -> str:
+    """测速结果中的延迟数据，如 'TCP 23ms / TLS 45ms'"""
+    text = f"TCP {result['tcp_ms']:.0f}ms"
+    if result.get('tls_ms') is not None:
+        text += f" / TLS {result['tls_ms']:.0f}ms"
+    return text
+
+
+def format_probe(result: Dict) -> str:
+    """测速结果的简短描述（用于进度显示）"""
+    if not result.get('ok'):
+        return f"{result['ip']}: 不可用（{result.get('error') or '未知错误'}）"
+    return f"{result['ip']}: {format_latency(result)}"
+
+
+def rank_ips(domain: str, ips: List[str], timeout: float = PROBE_TIMEOUT,
+             max_workers: int = PROBE_WORKERS,
+             progress: Optional[Callable[[Dict], None]] = None,
+             cancel: Optional[threading.Event] = None) -> List[Dict]:
+    """
+    并发测速并按延迟排序（可用的在前）
+
+    Args:
+        domain: 域名（TLS握手的SNI）
+        ips: 候选IP列表
+        timeout: 单个IP的超时时间（秒）
+        max_workers: 同时测速的IP数量上限
+        progress: 每个IP测速完成时的回调（在测速线程中调用）
+        cancel: 被设置时不再开始新的测速，立即返回已完成的结果
+
+    Returns:
+        测速结果列表（取消时只包含已完成的IP）
+    """
+    ips = list(dict.fromkeys(ips))
+    if not ips:
+        return []
+
+    todo: queue.Queue = queue.Queue()
+    for ip in ips:
+        todo.put(ip)
+    done: queue.Queue = queue.Queue()
+
+    def worker():
+        while not (cancel is not None and cancel.is_set()):
+            try:
+                ip = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = probe_ip(ip, domain, timeout)
+            except Exception as e:
+                # 每个IP都必须有结果，否则会一直等待
+                result = {'ip': ip, 'port': None, 'tcp_ms': None, 'tls_ms': None,
+                          'ok': False, 'error': f"测速失败: {e}"}
+            if progress:
+                try:
+                    progress(result)
+                except Exception:
+                    pass
+            done.put(result)
+
+    # 守护线程：取消后不必等待仍在进行的测速
+    for _ in range(max(1, min(max_workers, len(ips)))):
+        threading.Thread(target=worker, daemon=True).start()
+
+    results = []
+    while len(results) < len(ips):
+        if cancel is not None and cancel.is_set():
+            break
+        try:
+            results.append(done.get(timeout=CANCEL_POLL if cancel is not None else None))
+        except queue.Empty:
+            continue
+    return sorted(results, key=latency_ms)
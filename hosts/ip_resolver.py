@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IP解析引擎
+同时向所有来源发起查询，采用第一个通过校验的IPv4结果；
+首选来源（17ce.com）在短暂的优先窗口内返回时优先采用；
+测速选择时则收集所有来源返回的候选IP；共识模式下对各来源的结果按网段投票。
+"""
+
+import time
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 首选来源的优先窗口（秒）：窗口内其他来源先返回时，继续等待首选来源
+PRIORITY_GRACE = 1.5
+
+# 整体超时（秒），超过后放弃仍在进行的查询
+RESOLVE_TIMEOUT = 30.0
+
+# 等待结果时检查取消请求的间隔（秒）
+CANCEL_POLL = 0.1
+
+# 来源: (来源名称, 查询函数)，查询函数接收域名，返回IP或None
+Source = Tuple[str, Callable[[str], Optional[str]]]
+
+
+def _run_source(domain: str, name: str, func: Callable[[str], Optional[str]],
+                results: queue.Queue):
+    """在后台线程中执行一个来源的查询，结果放入队列"""
+    try:
+        ip = func(domain)
+    except Exception as e:
+        print(f"从 {name} 获取失败: {e}")
+        ip = None
+    results.put((name, ip))
+
+
+def resolve_first(domain: str, sources: List[Source],
+                  validate: Callable[[str], bool],
+                  grace: float = PRIORITY_GRACE,
+                  timeout: float = RESOLVE_TIMEOUT) -> Tuple[Optional[str], Optional[str]]:
+    """
+    并发查询所有来源，返回第一个有效结果
+
+    - 第一个来源为首选来源：它在grace秒内返回有效结果时直接采用
+    - 其他来源在grace秒内先返回时暂存，等首选来源失败或窗口结束再采用
+    - 得到结果后立即返回，其余仍在进行的查询被放弃（后台线程结束后结果丢弃）
+
+    Args:
+        domain: 域名
+        sources: 来源列表（按优先级排序）
+        validate: 结果校验函数
+        grace: 首选来源的优先窗口（秒）
+        timeout: 整体超时（秒）
+
+    Returns:
+        (IP地址, 来源名称)，全部失败返回 (None, None)
+    """
+    if not sources:
+        return None, None
+
+    results: queue.Queue = queue.Queue()
+    for name, func in sources:
+        # 守护线程：命令行退出时不必等待被放弃的查询
+        threading.Thread(target=_run_source, args=(domain, name, func, results),
+                         daemon=True).start()
+
+    priority = sources[0][0]
+    start = time.monotonic()
+    deadline = start + timeout
+    pending = len(sources)
+    priority_done = False
+    fallback: Optional[Tuple[str, str]] = None
+
+    while pending:
+        now = time.monotonic()
+        wait = deadline - now
+        if fallback:
+            # 已有备选结果，最多等到优先窗口结束
+            wait = min(wait, start + grace - now)
+        if wait <= 0:
+            break
+
+        try:
+            name, ip = results.get(timeout=wait)
+        except queue.Empty:
+            break
+        pending -= 1
+
+        if name == priority:
+            priority_done = True
+        if not ip or not validate(ip):
+            if priority_done and fallback:
+                return fallback[0], fallback[1]
+            continue
+
+        if name == priority or priority_done or time.monotonic() - start >= grace:
+            return ip, name
+        if fallback is None:
+            fallback = (ip, name)
+
+    if fallback:
+        return fallback
+    return None, None
+
+
+def collect_all(domain: str, sources: List[Source],
+                validate: Callable[[str], bool],
+                timeout: float = RESOLVE_TIMEOUT,
+                cancel: Optional[threading.Event] = None) -> List[Tuple[str, str]]:
+    """
+    并发查询所有来源，收集timeout秒内返回的全部有效结果（用于测速选择）
+
+    来源的查询函数可以返回单个IP或IP列表。
+    cancel被设置时立即返回已收到的结果，仍在进行的查询被放弃。
+
+    Returns:
+        [(来源名称, IP地址), ...]，按返回先后排序
+    """
+    if cancel is not None and cancel.is_set():
+        return []
+
+    results: queue.Queue = queue.Queue()
+    for name, func in sources:
+        threading.Thread(target=_run_source, args=(domain, name, func, results),
+                         daemon=True).start()
+
+    deadline = time.monotonic() + timeout
+    answers = []
+    pending = len(sources)
+    while pending:
+        if cancel is not None and cancel.is_set():
+            break
+        wait = deadline - time.monotonic()
+        if wait <= 0:
+            break
+        try:
+            # 分段等待，及时响应取消请求
+            name, ips = results.get(timeout=min(wait, CANCEL_POLL) if cancel is not None else wait)
+        except queue.Empty:
+            continue
+        pending -= 1
+        if isinstance(ips, str):
+            ips = [ips]
+        answers += [(name, ip) for ip in ips or [] if ip and validate(ip)]
+    return answers
+
+
+def _network_24(ip: str) -> str:
+    """IP所在的/24网段，如 '47.104.5.0/24'"""
+    return ip.rsplit('.', 1)[0] + '.0/24'
+
+
+def find_consensus(answers: List[Tuple[str, str]], trusted: Optional[List[str]] = None,
+                   quorum: int = 2) -> Dict:
+    """
+    对各来源的结果投票
+
+    按/24网段聚类（同一CDN节点组的不同IP算作同一答案），
+    trusted中的IP（如配置文件中的IP）作为一票，并优先作为所在网段的代表IP。
+    每个来源对同一网段只计一票。
+
+    Args:
+        answers: [(来源名称, IP地址), ...]，按返回先后排序
+        trusted: 可信IP列表
+        quorum: 达成共识所需的最少票数（同时需超过投票来源的半数）
+
+    Returns:
+        {'ip', 'confidence', 'sources', 'network', 'quorum'}，
+        quorum为False时ip为最先返回的有效结果（没有任何结果时为None）
+    """
+    votes: Dict[str, List[str]] = {}     # 网段 -> 投票来源
+    ip_votes: Dict[str, int] = {}        # IP -> 票数
+    order: Dict[str, int] = {}           # IP -> 首次出现的顺序
+    trusted = [ip for ip in (trusted or []) if ip]
+
+    labelled = [('配置文件', ip) for ip in trusted] + list(answers)
+    for index, (name, ip) in enumerate(labelled):
+        network = _network_24(ip)
+        voters = votes.setdefault(network, [])
+        if name not in voters:
+            voters.append(name)
+        ip_votes[ip] = ip_votes.get(ip, 0) + 1
+        order.setdefault(ip, index)
+
+    voter_count = len({name for name, _ in labelled})
+    if not votes:
+        return {'ip': None, 'confidence': 0.0, 'sources': [], 'network': None, 'quorum': False}
+
+    network, voters = max(votes.items(), key=lambda item: len(item[1]))
+    confidence = len(voters) / voter_count
+    if len(voters) >= quorum and len(voters) * 2 > voter_count:
+        members = [ip for ip in ip_votes if _network_24(ip) == network]
+        preferred = [ip for ip in trusted if ip in members]
+        ip = preferred[0] if preferred else max(members, key=lambda m: (ip_votes[m], -order[m]))
+        return {'ip': ip, 'confidence': confidence, 'sources': voters,
+                'network': network, 'quorum': True}
+
+    # 没有达成共识：退回最先返回的有效结果
+    if answers:
+        name, ip = answers[0]
+    else:
+        name, ip = '配置文件', trusted[0]
+    return {'ip': ip, 'confidence': len(votes[_network_24(ip)]) / voter_count,
+            'sources': [name], 'network': _network_24(ip), 'quorum': False}
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hosts文件流式扫描
+按块读取字节，先用子串搜索预过滤，只对命中的行做解析
+整个文件一次遍历，内存占用与文件大小无关
+"""
+
+import os
+import sys
+from typing import List, Optional, Iterable, Iterator, Tuple
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 每次读取的块大小
+CHUNK_SIZE = 1 << 20
+
+
+def root_suffixes(domains: Iterable[str]) -> List[bytes]:
+    """
+    计算域名列表的最小后缀集合（用作预过滤的搜索关键字）
+
+    例如 ['dl.58pic.com', '58pic.com'] -> [b'58pic.com']，
+    子域名一定包含其父域名，因此只需搜索父域名。
+    """
+    domain_set = set(domains)
+    roots = []
+    for domain in sorted(domain_set):
+        labels = domain.split('.')
+        has_parent = any('.'.join(labels[i:]) in domain_set for i in range(1, len(labels)))
+        if not has_parent:
+            roots.append(domain.encode('ascii'))
+    return roots
+
+
+def scan_buffer(data: bytes, needles: List[bytes], line_base: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """
+    在一段完整行组成的字节数据中查找包含关键字的行
+
+    Args:
+        data: 字节数据（应以完整行结尾）
+        needles: 关键字列表
+        line_base: data之前已有的行数，用于计算行号
+
+    Yields:
+        (行号, 行内容) 行号从1开始，行内容不含换行符
+    """
+    # 收集命中行的起始位置（同一行多次命中只记一次）
+    starts = set()
+    for needle in needles:
+        pos = data.find(needle)
+        while pos != -1:
+            start = data.rfind(b'\n', 0, pos) + 1
+            starts.add(start)
+            end = data.find(b'\n', pos)
+            if end == -1:
+                break
+            pos = data.find(needle, end)
+
+    # 按位置顺序输出，行号增量计算
+    line_num = line_base + 1
+    prev = 0
+    for start in sorted(starts):
+        line_num += data.count(b'\n', prev, start)
+        prev = start
+        end = data.find(b'\n', start)
+        if end == -1:
+            end = len(data)
+        yield line_num, data[start:end].rstrip(b'\r')
+
+
+def scan_hosts(needles: List[bytes], hosts_path: str,
+               max_lines: Optional[int] = None,
+               chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    流式扫描hosts文件，返回包含关键字的行
+
+    Args:
+        needles: 关键字列表（字节串）
+        hosts_path: hosts文件路径
+        max_lines: 最多扫描的行数，None表示扫描整个文件
+        chunk_size: 每次读取的字节数
+
+    Yields:
+        (行号, 行内容)
+    """
+    line_base = 0
+    carry = b''
+
+    with open(hosts_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                # 最后一行没有换行符
+                if carry:
+                    yield from _limit(scan_buffer(carry, needles, line_base), max_lines)
+                return
+
+            buf = carry + chunk
+            cut = buf.rfind(b'\n')
+            if cut == -1:
+                # 整块都在同一行内，继续读取
+                carry = buf
+                continue
+
+            block, carry = buf[:cut + 1], buf[cut + 1:]
+            yield from _limit(scan_buffer(block, needles, line_base), max_lines)
+
+            line_base += block.count(b'\n')
+            if max_lines and line_base >= max_lines:
+                return
+
+
+def _limit(hits: Iterator[Tuple[int, bytes]], max_lines: Optional[int]) -> Iterator[Tuple[int, bytes]]:
+    """过滤超出最大行数的结果"""
+    for line_num, line in hits:
+        if max_lines and line_num > max_lines:
+            return
+        yield line_num, line
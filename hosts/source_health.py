@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IP查询来源健康度
+记录每个来源最近若干次查询的成功与耗时（保存在用户缓存目录，GUI和命令行共用），
+据此动态调整来源顺序；连续失败的来源熔断一段时间，冷却后放行一次试探查询（半开）
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.app_dirs import get_app_cache_dir
+from utils.elevate_permission import atomic_write_file
+from utils.file_lock import file_lock
+
+# 每个来源保留的最近查询次数（滑动窗口）
+WINDOW_SIZE = 20
+# 连续失败多少次后熔断
+FAILURE_THRESHOLD = 3
+# 熔断后的冷却时间（秒）
+COOLDOWN = 10 * 60
+
+STATE_CLOSED = 'closed'        # 正常
+STATE_OPEN = 'open'            # 熔断中，跳过
+STATE_HALF_OPEN = 'half_open'  # 冷却结束，放行一次试探
+
+_lock = threading.Lock()
+# 本进程中正在进行试探查询的来源
+_probing = set()
+
+
+def get_health_path() -> str:
+    """健康度数据文件路径"""
+    return os.path.join(get_app_cache_dir(), 'source_health.json')
+
+
+def _load() -> Dict[str, Dict]:
+    try:
+        with open(get_health_path(), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _state(entry: Dict, now: float) -> str:
+    opened_at = entry.get('opened_at')
+    if not opened_at:
+        return STATE_CLOSED
+    if now - opened_at < COOLDOWN:
+        return STATE_OPEN
+    return STATE_HALF_OPEN
+
+
+def record_result(source: str, success: bool, latency_ms: float):
+    """
+    记录一次查询结果
+
+    成功时关闭熔断；连续失败达到阈值（或半开试探失败）时熔断。
+    """
+    path = get_health_path()
+    now = time.time()
+    try:
+        with _lock, file_lock(path):
+            data = _load()
+            entry = data.setdefault(source, {'results': [], 'failures': 0, 'opened_at': None})
+            entry['results'] = (entry['results'] + [[bool(success), round(latency_ms, 1), now]])[-WINDOW_SIZE:]
+            if success:
+                entry['failures'] = 0
+                entry['opened_at'] = None
+            else:
+                entry['failures'] += 1
+                if entry['failures'] >= FAILURE_THRESHOLD or _state(entry, now) == STATE_HALF_OPEN:
+                    entry['opened_at'] = now
+            _probing.discard(source)
+            atomic_write_file(path, json.dumps(data, ensure_ascii=False))
+    except OSError as e:
+        print(f"警告: 保存来源健康度失败: {e}")
+
+
+def _score(entry: Optional[Dict]) -> Tuple[float, float]:
+    """排序键：成功率高、平均耗时短的在前（没有记录的来源视为健康）"""
+    results = (entry or {}).get('results') or []
+    if not results:
+        return (-1.0, 0.0)
+    successes = [latency for ok, latency, _ in results if ok]
+    rate = len(successes) / len(results)
+    avg_latency = sum(successes) / len(successes) if successes else float('inf')
+    return (-rate, avg_latency)
+
+
+def order_sources(sources: List[Tuple[str, Callable]]) -> List[Tuple[str, Callable]]:
+    """
+    按健康度排序来源，跳过熔断中的来源
+
+    冷却结束的来源（半开）只放行一个试探查询；
+    所有来源都熔断时不跳过任何来源，避免完全无法查询。
+    """
+    data = _load()
+    now = time.time()
+    allowed = []
+    with _lock:
+        for name, func in sources:
+            entry = data.get(name)
+            state = _state(entry, now) if entry else STATE_CLOSED
+            if state == STATE_OPEN:
+                continue
+            if state == STATE_HALF_OPEN:
+                if name in _probing:
+                    continue
+                _probing.add(name)
+            allowed.append((name, func))
+
+    if not allowed:
+        return list(sources)
+    # sorted是稳定排序，健康度相同的来源保持原有优先级
+    return sorted(allowed, key=lambda source: _score(data.get(source[0])))
+
+
+def tracked(name: str, func: Callable[[str], object],
+            validate: Callable[[object], bool]) -> Callable[[str], object]:
+    """包装查询函数：记录每次查询是否成功（结果通过validate校验）及耗时"""
+    def wrapper(domain: str):
+        start = time.monotonic()
+        success = False
+        try:
+            result = func(domain)
+            success = validate(result)
+            return result
+        finally:
+            record_result(name, success, (time.monotonic() - start) * 1000)
+    return wrapper
+
+
+def get_health_report() -> Dict[str, Dict]:
+    """
+    返回各来源的健康度
+
+    Returns:
+        {来源: {'samples', 'success_rate', 'avg_latency_ms', 'state'}}
+    """
+    now = time.time()
+    report = {}
+    for name, entry in _load().items():
+        results = entry.get('results') or []
+        latencies = [latency for ok, latency, _ in results if ok]
+        report[name] = {
+            'samples': len(results),
+            'success_rate': len(latencies) / len(results) if results else None,
+            'avg_latency_ms': sum(latencies) / len(latencies) if latencies else None,
+            'state': _state(entry, now),
+        }
+    return report
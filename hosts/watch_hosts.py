@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hosts文件变化监听
+Linux使用inotify（监听所在目录，兼容其他工具以rename方式替换文件），
+其他系统退化为定时比较文件签名（只stat，不解析）
+"""
+
+import os
+import sys
+import struct
+import platform
+import time
+from typing import Dict
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts.hosts_cache import file_signature
+
+# inotify事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+               IN_MOVED_TO | IN_CREATE | IN_DELETE)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class PollingWatcher:
+    """定时比较文件签名（路径、mtime、大小、inode）"""
+
+    def __init__(self, path: str, interval: float = 2.0):
+        self.path = path
+        self.interval = interval
+        self._signature = file_signature(path)
+        self._next_check = time.monotonic() + interval
+
+    def wait(self, timeout: float) -> bool:
+        """
+        等待文件变化
+
+        每interval秒最多检查一次文件签名，与timeout无关：
+        调用方可以用较短的timeout及时响应停止请求，而不会更频繁地stat。
+
+        Returns:
+            timeout时间内文件是否发生变化
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.interval
+                signature = file_signature(self.path)
+                if signature != self._signature:
+                    self._signature = signature
+                    return True
+            remaining = deadline - now
+            if remaining <= 0:
+                return False
+            time.sleep(min(self._next_check - now, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于inotify的监听（仅Linux）"""
+
+    def __init__(self, path: str):
+        import ctypes
+        import ctypes.util
+
+        self.path = path
+        self._dir = os.path.dirname(os.path.realpath(path)) or '.'
+        self._name = os.path.basename(os.path.realpath(path)).encode()
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+
+        wd = libc.inotify_add_watch(self._fd, self._dir.encode(), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f'inotify_add_watch 失败: {self._dir}')
+
+    def wait(self, timeout: float) -> bool:
+        """
+        等待文件变化
+
+        Returns:
+            timeout时间内文件是否发生变化
+        """
+        import select
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+
+        changed = False
+        try:
+            while True:
+                data = os.read(self._fd, 4096)
+                if not data:
+                    break
+                offset = 0
+                while offset < len(data):
+                    _, _, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                    start = offset + _EVENT_HEADER.size
+                    name = data[start:start + name_len].rstrip(b'\0')
+                    if name == self._name:
+                        changed = True
+                    offset = start + name_len
+        except BlockingIOError:
+            pass
+        return changed
+
+    def close(self):
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+def create_watcher(path: str, interval: float = 2.0):
+    """创建适合当前系统的监听器（Linux优先使用inotify）"""
+    if platform.system() == 'Linux':
+        try:
+            return InotifyWatcher(path)
+        except Exception as e:
+            print(f"inotify不可用，改用定时检查: {e}")
+    return PollingWatcher(path, interval=interval)
+
+
+def diff_bindings(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    比较两次check_hosts结果
+
+    Returns:
+        {'added': {...}, 'removed': {...}, 'changed': {...}}，
+        changed中的值为新的绑定信息（IP或行号变化）
+    """
+    added = {d: info for d, info in new.items() if d not in old}
+    removed = {d: info for d, info in old.items() if d not in new}
+    changed = {d: info for d, info in new.items() if d in old and old[d] != info}
+    return {'added': added, 'removed': removed, 'changed': changed}
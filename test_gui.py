@@ -117,6 +117,229 @@ def test_tool_modules():
     return True
 
 
+def test_dns_client():
+    """测试DNS查询客户端（使用本地模拟DNS服务器，不访问网络）"""
+    print("\n测试DNS查询客户端...")
+    
+    import socket
+    import struct
+    import threading
+    
+    try:
+        from hosts.dns_client import resolve_a
+        
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+        
+        def serve():
+            # 对收到的查询返回两条A记录（使用名称压缩指针指向问题部分）
+            query, addr = server.recvfrom(512)
+            query_id = struct.unpack('!H', query[:2])[0]
+            header = struct.pack('!HHHHHH', query_id, 0x8180, 1, 2, 0, 0)
+            answers = b''.join(
+                struct.pack('!HHHIH', 0xC00C, 1, 1, ttl, 4) + socket.inet_aton(ip)
+                for ip, ttl in (('10.0.0.1', 300), ('10.0.0.2', 60))
+            )
+            server.sendto(header + query[12:] + answers, addr)
+        
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        records = resolve_a('dl.58pic.com', resolvers=[f'udp://127.0.0.1:{port}'], timeout=2)
+        thread.join(timeout=2)
+        server.close()
+        
+        result = [(record['ip'], record['ttl']) for record in records]
+        assert result == [('10.0.0.1', 300), ('10.0.0.2', 60)], result
+        print(f"✓ DNS查询: {result}")
+        return True
+    except Exception as e:
+        print(f"✗ DNS查询测试失败: {e}")
+        return False
+
+
+def test_latency_probe():
+    """测试延迟测量（TCP方式，连接本地监听端口，不访问网络）"""
+    print("\n测试延迟测量...")
+    
+    import socket
+    
+    try:
+        from utils.latency_probe import measure_latency
+        
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(8)
+        port = server.getsockname()[1]
+        result = measure_latency('127.0.0.1', count=3, interval=0, method='tcp', port=port)
+        server.close()
+        
+        assert result['method'] == 'tcp', result
+        assert result['success'] and result['received'] == 3 and result['loss'] == 0, result
+        assert result['min_ms'] <= result['avg_ms'] <= result['max_ms'], result
+        print(f"✓ 延迟测量: 平均 {result['avg_ms']:.2f}ms, 往返时间 {result['rtts']}")
+        return True
+    except Exception as e:
+        print(f"✗ 延迟测量测试失败: {e}")
+        return False
+
+
+def test_hosts_transaction():
+    """测试hosts事务（使用临时hosts文件，备份保存到临时数据目录）"""
+    print("\n测试hosts事务...")
+    
+    import shutil
+    import tempfile
+    
+    temp_dir = tempfile.mkdtemp()
+    old_data_home = os.environ.get('XDG_DATA_HOME')
+    os.environ['XDG_DATA_HOME'] = temp_dir
+    
+    def write_hosts(name, content):
+        path = os.path.join(temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+    
+    try:
+        from hosts.hosts_file import BLOCK_BEGIN, BLOCK_END
+        from hosts.hosts_transaction import HostsTransaction
+        from utils.elevate_permission import check_permission
+        
+        # 旧版本写在区域外的绑定迁移进管理区域
+        path = write_hosts('hosts_migrate', b"127.0.0.1 localhost\n1.1.1.1 dl.58pic.com\n")
+        txn = HostsTransaction(path)
+        assert txn.bind('dl.58pic.com', '2.2.2.2') == 'updated'
+        lines = txn.hosts.to_lines()
+        assert '1.1.1.1 dl.58pic.com\n' not in lines, lines
+        block = lines[lines.index(BLOCK_BEGIN + '\n'):lines.index(BLOCK_END + '\n')]
+        assert '2.2.2.2\tdl.58pic.com\n' in block, lines
+        print("✓ 区域外的旧绑定已迁移进管理区域")
+        
+        # 区域外已有相同绑定时保持原样
+        path = write_hosts('hosts_same', b"127.0.0.1 localhost\n1.1.1.1 dl.58pic.com\n")
+        txn = HostsTransaction(path)
+        assert txn.bind('dl.58pic.com', '1.1.1.1') == '' and txn.is_noop
+        print("✓ 相同绑定不修改")
+        
+        # 相互抵消的修改（绑定后解绑、改IP后改回）
+        txn.bind('preview.qiantucdn.com', '3.3.3.3')
+        txn.unbind('preview.qiantucdn.com')
+        txn.bind('dl.58pic.com', '4.4.4.4')
+        txn.bind('dl.58pic.com', '1.1.1.1')
+        assert txn.changes and txn.is_noop, txn.changes
+        print("✓ 相互抵消的修改不提交")
+        
+        # 提交需要写入权限，没有管理员权限时不测试（避免弹出密码提示）
+        if check_permission():
+            original = b"127.0.0.1 localhost\r\n# user comment\n"
+            path = write_hosts('hosts_commit', original)
+            txn = HostsTransaction(path)
+            txn.bind('preview.qiantucdn.com', '3.3.3.3')
+            success, error_msg = txn.commit()
+            assert success, error_msg
+            with open(path, 'rb') as f:
+                content = f.read()
+            # 用户内容原样保留，管理区域使用文件原有的换行符
+            assert content.startswith(original), content
+            assert b"3.3.3.3\tpreview.qiantucdn.com\r\n" in content, content
+            
+            txn = HostsTransaction(path)
+            assert txn.bind('preview.qiantucdn.com', '3.3.3.3') == '' and txn.is_noop
+            txn.unbind('preview.qiantucdn.com')
+            success, error_msg = txn.commit()
+            assert success, error_msg
+            with open(path, 'rb') as f:
+                assert f.read() == original
+            print("✓ 提交与撤销（换行符保持不变）")
+        else:
+            print("- 没有管理员权限，跳过提交测试")
+        return True
+    except Exception as e:
+        print(f"✗ hosts事务测试失败: {e}")
+        return False
+    finally:
+        if old_data_home is None:
+            os.environ.pop('XDG_DATA_HOME', None)
+        else:
+            os.environ['XDG_DATA_HOME'] = old_data_home
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_hosts_backup():
+    """测试hosts备份存储（去重和清理，使用临时数据目录）"""
+    print("\n测试hosts备份...")
+    
+    import shutil
+    import tempfile
+    
+    temp_dir = tempfile.mkdtemp()
+    old_data_home = os.environ.get('XDG_DATA_HOME')
+    os.environ['XDG_DATA_HOME'] = temp_dir
+    
+    try:
+        from hosts.hosts_backup import backup_hosts, list_backups, read_backup, get_backup_dir
+        
+        path = os.path.join(temp_dir, 'hosts')
+        
+        def backup(content):
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            return backup_hosts(path, max_backups=2)
+        
+        first = backup("127.0.0.1 localhost\n")
+        assert backup("127.0.0.1 localhost\n") == first
+        assert len(list_backups()) == 1, list_backups()
+        print("✓ 内容相同时不重复备份")
+        
+        backup("1.1.1.1 dl.58pic.com\n")
+        latest = backup("2.2.2.2 dl.58pic.com\n")
+        backups = list_backups()
+        assert [entry['id'] for entry in backups][0] == latest and len(backups) == 2, backups
+        objects = [name for name in os.listdir(get_backup_dir()) if name.endswith('.gz')]
+        assert len(objects) == 2, objects
+        assert read_backup(first) is None
+        assert read_backup(latest) == "2.2.2.2 dl.58pic.com\n"
+        print("✓ 超出数量的旧备份已清理")
+        return True
+    except Exception as e:
+        print(f"✗ hosts备份测试失败: {e}")
+        return False
+    finally:
+        if old_data_home is None:
+            os.environ.pop('XDG_DATA_HOME', None)
+        else:
+            os.environ['XDG_DATA_HOME'] = old_data_home
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_consensus():
+    """测试共识投票（不访问网络）"""
+    print("\n测试共识投票...")
+    
+    try:
+        from hosts.ip_resolver import find_consensus
+        
+        # 同一/24网段的两个来源达成共识
+        answers = [('a', '1.2.3.4'), ('b', '1.2.3.5'), ('c', '9.9.9.9')]
+        result = find_consensus(answers, quorum=2)
+        assert result['quorum'] and result['ip'] == '1.2.3.4', result
+        assert result['network'] == '1.2.3.0/24' and abs(result['confidence'] - 2 / 3) < 1e-9, result
+        
+        # 配置文件中的IP作为一票，并优先作为所在网段的代表
+        result = find_consensus(answers, trusted=['1.2.3.7'], quorum=2)
+        assert result['quorum'] and result['ip'] == '1.2.3.7', result
+        
+        # 没有达成共识时退回最先返回的结果
+        result = find_consensus([('a', '1.1.1.1'), ('b', '2.2.2.2')], quorum=2)
+        assert not result['quorum'] and result['ip'] == '1.1.1.1', result
+        print(f"✓ 共识投票: {result['ip']}（置信度 {result['confidence']:.0%}）")
+        return True
+    except Exception as e:
+        print(f"✗ 共识投票测试失败: {e}")
+        return False
+
+
 def main():
     """主测试函数"""
     print("=" * 60)
@@ -137,6 +360,26 @@ def main():
     if not test_tool_modules():
         all_passed = False
     
+    # 测试DNS查询客户端
+    if not test_dns_client():
+        all_passed = False
+    
+    # 测试延迟测量
+    if not test_latency_probe():
+        all_passed = False
+    
+    # 测试hosts事务
+    if not test_hosts_transaction():
+        all_passed = False
+    
+    # 测试hosts备份
+    if not test_hosts_backup():
+        all_passed = False
+    
+    # 测试共识投票
+    if not test_consensus():
+        all_passed = False
+    
     print("\n" + "=" * 60)
     if all_passed:
         print("✓ 所有测试通过！")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+应用数据目录
+保存备份、缓存等数据（普通用户权限即可写入，不占用系统目录）
+"""
+
+import os
+import platform
+
+APP_NAME = 'qiantu-user-tools'
+
+
+def get_app_data_dir(*parts: str) -> str:
+    """
+    获取应用数据目录（不存在时自动创建）
+
+    - Windows: %APPDATA%\\qiantu-user-tools
+    - macOS: ~/Library/Application Support/qiantu-user-tools
+    - Linux: $XDG_DATA_HOME/qiantu-user-tools（默认 ~/.local/share）
+
+    Args:
+        parts: 子目录
+    """
+    system = platform.system()
+    home = os.path.expanduser('~')
+
+    if system == 'Windows':
+        base = os.environ.get('APPDATA') or os.path.join(home, 'AppData', 'Roaming')
+    elif system == 'Darwin':
+        base = os.path.join(home, 'Library', 'Application Support')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(home, '.local', 'share')
+
+    path = os.path.join(base, APP_NAME, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_app_cache_dir(*parts: str) -> str:
+    """
+    获取应用缓存目录（不存在时自动创建，删除不影响功能）
+
+    - Windows: %LOCALAPPDATA%\\qiantu-user-tools\\cache
+    - macOS: ~/Library/Caches/qiantu-user-tools
+    - Linux: $XDG_CACHE_HOME/qiantu-user-tools（默认 ~/.cache）
+    """
+    system = platform.system()
+    home = os.path.expanduser('~')
+
+    if system == 'Windows':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(home, 'AppData', 'Local')
+        path = os.path.join(base, APP_NAME, 'cache', *parts)
+    elif system == 'Darwin':
+        path = os.path.join(home, 'Library', 'Caches', APP_NAME, *parts)
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(home, '.cache')
+        path = os.path.join(base, APP_NAME, *parts)
+
+    os.makedirs(path, exist_ok=True)
+    return path
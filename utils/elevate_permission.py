@@ -7,11 +7,12 @@
 
 import os
 import sys
+import errno
+import shlex
 import platform
 import subprocess
 import tempfile
-import shutil
-from typing import Optional, Tuple
+from typing import Tuple
 
 
 def check_permission() -> bool:
@@ -29,115 +30,99 @@ def check_permission() -> bool:
         return os.geteuid() == 0
 
 
-def elevate_copy_file(src_path: str, dst_path: str) -> Tuple[bool, str]:
+def _fsync_dir(dir_path: str):
+    """同步目录项，保证rename本身已落盘（Windows不支持，直接跳过）"""
+    if platform.system() == 'Windows':
+        return
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _replace_file(temp_path: str, file_path: str):
     """
-    使用提升的权限复制文件
-    
-    Args:
-        src_path: 源文件路径
-        dst_path: 目标文件路径
-        
-    Returns:
-        (成功标志, 错误消息)
+    用临时文件替换目标文件（同目录rename）
+
+    Windows下os.replace会换成临时文件的默认ACL和属主，
+    因此目标存在时使用ReplaceFileW，保留原文件的ACL等安全属性。
     """
-    system = platform.system()
-    
-    if system == 'Windows':
-        return _elevate_copy_windows(src_path, dst_path)
-    else:
-        return _elevate_copy_unix(src_path, dst_path)
+    if platform.system() == 'Windows' and os.path.exists(file_path):
+        import ctypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        if not kernel32.ReplaceFileW(file_path, temp_path, None, 0, None, None):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return
+    os.replace(temp_path, file_path)
 
 
-def _elevate_copy_windows(src_path: str, dst_path: str) -> Tuple[bool, str]:
-    """Windows系统：使用UAC提升权限复制文件"""
+def atomic_write_file(file_path: str, content: str):
+    """
+    原子写入文件（需要对目标目录有写权限）
+
+    先写入同目录下的临时文件并fsync，复制原文件的权限和属主，
+    再用rename替换原文件（Windows保留原文件的ACL）。任何时刻中断，原文件要么是旧内容、要么是新内容。
+    内容按原样写入，不转换换行符。
+
+    Raises:
+        OSError: 写入失败（包括PermissionError），原文件保持不变
+    """
+    dir_path = os.path.dirname(os.path.abspath(file_path))
     try:
-        import ctypes
-        from ctypes import wintypes
-        
-        if ctypes.windll.shell32.IsUserAnAdmin():
-            shutil.copy2(src_path, dst_path)
-            return True, ""
-        
-        # 需要提升权限
-        temp_script = tempfile.NamedTemporaryFile(
-            mode='w', suffix='.py', delete=False, encoding='utf-8'
-        )
-        temp_script.write(f'''
-import shutil
-shutil.copy2(r"{src_path}", r"{dst_path}")
-''')
-        temp_script.close()
-        
-        result = ctypes.windll.shell32.ShellExecuteW(
-            None, "runas", sys.executable, temp_script.name, None, 1
-        )
-        
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        st = None
+
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(file_path)}.", suffix='.tmp', dir=dir_path
+    )
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if st is not None:
+            os.chmod(temp_path, st.st_mode & 0o7777)
+            if hasattr(os, 'chown'):
+                try:
+                    os.chown(temp_path, st.st_uid, st.st_gid)
+                except PermissionError:
+                    pass  # 非root无法修改属主，保持当前用户
+
         try:
-            os.unlink(temp_script.name)
-        except:
+            _replace_file(temp_path, file_path)
+        except OSError as e:
+            if not os.path.exists(file_path) or e.errno not in (errno.EBUSY, errno.EXDEV):
+                raise
+            # 目标是挂载点（如容器中的/etc/hosts）时无法rename，退化为原地写入
+            with open(file_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.unlink(temp_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
             pass
-        
-        if result > 32:
-            return True, ""
-        else:
-            return False, f"权限提升失败 (错误代码: {result})"
-            
-    except Exception as e:
-        return False, f"Windows权限提升失败: {str(e)}"
+        raise
 
-
-def _elevate_copy_unix(src_path: str, dst_path: str) -> Tuple[bool, str]:
-    """macOS/Linux系统：使用sudo和osascript提示输入密码"""
-    try:
-        if platform.system() == 'Darwin':  # macOS
-            # 转义路径中的特殊字符
-            src_quoted = src_path.replace("'", "'\\''")
-            dst_quoted = dst_path.replace("'", "'\\''")
-            
-            # 使用正确的 AppleScript 语法
-            # 使用 with administrator privileges 会自动提示输入密码
-            script = f'''
-do shell script "cp '{src_quoted}' '{dst_quoted}'" with administrator privileges
-'''
-            result = subprocess.run(
-                ['osascript', '-e', script],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            if result.returncode == 0:
-                return True, ""
-            else:
-                error_msg = result.stderr.strip()
-                if "User canceled" in error_msg or "用户取消" in error_msg or "canceled" in error_msg.lower():
-                    return False, "用户取消了密码输入"
-                else:
-                    return False, f"权限提升失败: {error_msg}"
-        else:
-            # Linux
-            result = subprocess.run(
-                ['sudo', 'cp', src_path, dst_path],
-                input='',
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            if result.returncode == 0:
-                return True, ""
-            else:
-                return False, f"权限提升失败: {result.stderr.strip()}"
-                
-    except subprocess.TimeoutExpired:
-        return False, "操作超时，请重试"
-    except Exception as e:
-        return False, f"权限提升失败: {str(e)}"
+    _fsync_dir(dir_path)
 
 
 def elevate_write_file(file_path: str, content: str) -> Tuple[bool, str]:
     """
     使用提升的权限写入文件（类似SwitchHosts!）
+
+    与atomic_write_file相同：写入同目录临时文件、同步、保留权限和属主后rename替换，
+    不会出现写了一半的文件。
     
     Args:
         file_path: 要写入的文件路径
@@ -164,19 +149,21 @@ def _elevate_write_windows(file_path: str, content: str) -> Tuple[bool, str]:
         # 检查是否已有管理员权限
         if ctypes.windll.shell32.IsUserAnAdmin():
             # 直接写入
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            atomic_write_file(file_path, content)
             return True, ""
         
         # 需要提升权限，使用ShellExecuteW
-        # 创建一个临时脚本文件来执行写入操作
+        # 创建一个临时脚本文件，以管理员权限调用atomic_write_file
+        # （唯一的临时文件名，ReplaceFileW保留hosts文件的ACL）
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         temp_script = tempfile.NamedTemporaryFile(
             mode='w', suffix='.py', delete=False, encoding='utf-8'
         )
         temp_script.write(f'''
 import sys
-with open(r"{file_path}", "w", encoding="utf-8") as f:
-    f.write({repr(content)})
+sys.path.insert(0, {package_dir!r})
+from utils.elevate_permission import atomic_write_file
+atomic_write_file({file_path!r}, {content!r})
 ''')
         temp_script.close()
         
@@ -205,24 +192,51 @@ with open(r"{file_path}", "w", encoding="utf-8") as f:
         return False, f"Windows权限提升失败: {str(e)}"
 
 
+def _atomic_install_command(src_path: str, file_path: str) -> str:
+    """
+    生成以root身份原子替换文件的shell命令
+
+    mktemp在同目录创建唯一的临时文件，install复制内容并设置原文件的权限和属主，
+    sync落盘后再mv（同目录rename）。目标是挂载点无法rename时退化为原地写入。
+    """
+    try:
+        st = os.stat(file_path)
+        mode, uid, gid = st.st_mode & 0o7777, st.st_uid, st.st_gid
+    except OSError:
+        mode, uid, gid = 0o644, 0, 0
+
+    dir_path = os.path.dirname(os.path.abspath(file_path))
+    template = os.path.join(dir_path, f".{os.path.basename(file_path)}.XXXXXX")
+    src, dst = shlex.quote(src_path), shlex.quote(file_path)
+
+    return ' && '.join([
+        f"tmp=$(mktemp {shlex.quote(template)})",
+        f"install -m {mode:o} -o {uid} -g {gid} {src} \"$tmp\"",
+        "sync",
+        f"{{ mv -f \"$tmp\" {dst} || {{ cat \"$tmp\" > {dst} && rm -f \"$tmp\"; }}; }}",
+    ])
+
+
 def _elevate_write_unix(file_path: str, content: str) -> Tuple[bool, str]:
     """macOS/Linux系统：使用sudo和osascript提示输入密码"""
+    temp_file = None
     try:
         # 创建临时文件保存内容
         temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8')
         temp_file.write(content)
         temp_file.close()
         
-        # 使用osascript（macOS）或sudo（Linux）来复制文件
+        # 复制和替换在同一条命令中完成，只提示一次密码
+        command = _atomic_install_command(temp_file.name, file_path)
+        
+        # 使用osascript（macOS）或sudo（Linux）来执行命令
         if platform.system() == 'Darwin':  # macOS
-            # 转义路径中的特殊字符
-            temp_file_quoted = temp_file.name.replace("'", "'\\''")
-            file_path_quoted = file_path.replace("'", "'\\''")
+            # 转义AppleScript字符串中的反斜杠和双引号
+            command_quoted = command.replace('\\', '\\\\').replace('"', '\\"')
             
-            # 使用正确的 AppleScript 语法
             # 使用 with administrator privileges 会自动提示输入密码
             script = f'''
-do shell script "cp '{temp_file_quoted}' '{file_path_quoted}'" with administrator privileges
+do shell script "{command_quoted}" with administrator privileges
 '''
             
             # 执行AppleScript
@@ -233,14 +247,6 @@ do shell script "cp '{temp_file_quoted}' '{file_path_quoted}'" with administrato
                 timeout=60
             )
             
-            # 清理临时文件
-            cleanup_success = False
-            try:
-                os.unlink(temp_file.name)
-                cleanup_success = True
-            except:
-                pass
-            
             if result.returncode == 0:
                 return True, ""
             else:
@@ -252,19 +258,13 @@ do shell script "cp '{temp_file_quoted}' '{file_path_quoted}'" with administrato
         else:
             # Linux系统：使用sudo
             result = subprocess.run(
-                ['sudo', 'cp', temp_file.name, file_path],
+                ['sudo', 'sh', '-c', command],
                 input='',  # 密码通过终端输入
                 capture_output=True,
                 text=True,
                 timeout=60
             )
             
-            # 清理临时文件
-            try:
-                os.unlink(temp_file.name)
-            except:
-                pass
-            
             if result.returncode == 0:
                 return True, ""
             else:
@@ -273,12 +273,14 @@ do shell script "cp '{temp_file_quoted}' '{file_path_quoted}'" with administrato
     except subprocess.TimeoutExpired:
         return False, "操作超时，请重试"
     except Exception as e:
-        # 清理临时文件
-        try:
-            os.unlink(temp_file.name)
-        except:
-            pass
         return False, f"权限提升失败: {str(e)}"
+    finally:
+        # 清理临时文件
+        if temp_file is not None:
+            try:
+                os.unlink(temp_file.name)
+            except OSError:
+                pass
 
 
 def elevate_execute_command(command: list) -> Tuple[bool, str, str]:
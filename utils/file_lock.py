@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨进程文件锁
+GUI和命令行可能同时读写同一个缓存文件，读-改-写过程需要加锁
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# 同一进程内的线程先用线程锁排队，避免反复轮询文件锁
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = 10.0):
+    """
+    获取文件锁（锁文件为 path + '.lock'）
+
+    超时后不再等待，直接继续执行（缓存类数据宁可偶尔覆盖，也不能卡住界面）。
+
+    Args:
+        path: 要保护的文件路径
+        timeout: 最长等待时间（秒）
+    """
+    lock_path = f"{path}.lock"
+    with _thread_lock(lock_path):
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        locked = False
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    _lock_fd(fd)
+                    locked = True
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        print(f"警告: 等待文件锁超时: {lock_path}")
+                        break
+                    time.sleep(0.05)
+            yield
+        finally:
+            if locked:
+                try:
+                    _unlock_fd(fd)
+                except OSError:
+                    pass
+            os.close(fd)
+
+
+if os.name == 'nt':
+    import msvcrt
+
+    def _lock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    def _unlock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
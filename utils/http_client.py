@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端
+所有对外请求共用一个Session：按主机保持长连接（连接池），
+统一的连接/读取超时和重试退避策略，批量查询时复用已建立的TCP/TLS连接
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 默认超时（秒）：(连接超时, 读取超时)
+DEFAULT_TIMEOUT = (5, 10)
+
+# 每个主机的连接池大小（并发查询多个域名时同一主机会有多个连接）
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+
+DEFAULT_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    """创建带连接池和重试策略的Session"""
+    # 只对连接失败和网关类错误重试一次；POST也重试（17ce的查询是幂等的）
+    retry = Retry(
+        total=1,
+        connect=1,
+        read=0,
+        status=1,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'POST']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                          max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = DEFAULT_USER_AGENT
+    return session
+
+
+def get_session() -> requests.Session:
+    """获取共享Session（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def request(method: str, url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """
+    发送请求（使用共享Session）
+
+    Args:
+        method: 请求方法
+        url: 地址
+        timeout: 超时时间，秒数或 (连接超时, 读取超时)
+        kwargs: 传给requests的其他参数
+
+    Raises:
+        requests.exceptions.RequestException: 请求失败
+    """
+    return get_session().request(method, url, timeout=timeout, **kwargs)
+
+
+def http_get(url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """发送GET请求（使用共享Session）"""
+    return request('GET', url, timeout=timeout, **kwargs)
+
+
+def http_post(url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """发送POST请求（使用共享Session）"""
+    return request('POST', url, timeout=timeout, **kwargs)
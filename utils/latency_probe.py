@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网络延迟测量
+在进程内发送ICMP Echo（优先使用无需管理员权限的ICMP套接字，有权限时使用原始套接字），
+系统不允许ICMP或ICMP全部超时（网络静默丢弃ICMP）时改为测量TCP连接时间；
+不调用ping命令，也不解析其输出
+"""
+
+import os
+import sys
+import time
+import errno
+import random
+import socket
+import struct
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 每次探测的超时（秒）
+PROBE_TIMEOUT = 2.0
+# 两次探测之间的间隔（秒）
+PROBE_INTERVAL = 0.2
+# TCP测量使用的端口
+TCP_PORT = 443
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# 目标端口拒绝连接也说明收到了对方的响应，同样可以计算往返时间
+_TCP_ANSWERED = (errno.ECONNREFUSED, getattr(errno, 'WSAECONNREFUSED', errno.ECONNREFUSED))
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _build_echo(ident: int, seq: int) -> bytes:
+    payload = struct.pack('!d', time.perf_counter()) + b'qiantu-user-tools'
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + payload)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def _open_icmp_socket() -> Tuple[Optional[socket.socket], bool]:
+    """
+    打开ICMP套接字
+
+    Returns:
+        (套接字, 是否为原始套接字)，系统不允许时返回 (None, False)
+    """
+    # 无需特权的ICMP套接字（macOS，以及ping_group_range允许的Linux）
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except (OSError, AttributeError):
+        pass
+    # 原始套接字（需要root/管理员权限）
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+    except (OSError, AttributeError):
+        return None, False
+
+
+def _icmp_rtt(sock: socket.socket, raw: bool, ip: str, ident: int, seq: int,
+              timeout: float) -> Optional[float]:
+    """发送一次ICMP Echo，返回往返时间（毫秒），超时返回None"""
+    start = time.perf_counter()
+    sock.sendto(_build_echo(ident, seq), (ip, 0))
+    deadline = start + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        sock.settimeout(remaining)
+        try:
+            data, addr = sock.recvfrom(1024)
+        except socket.timeout:
+            return None
+        elapsed = (time.perf_counter() - start) * 1000
+        # 原始套接字（以及macOS的ICMP套接字）收到的数据包含IP头
+        if len(data) >= 20 and data[0] >> 4 == 4:
+            data = data[(data[0] & 0x0F) * 4:]
+        if len(data) < 8 or addr[0] != ip:
+            continue
+        icmp_type, _, _, reply_ident, reply_seq = struct.unpack('!BBHHH', data[:8])
+        # 无特权ICMP套接字的标识由系统改写，只能按序号匹配
+        if icmp_type == ICMP_ECHO_REPLY and reply_seq == seq and (not raw or reply_ident == ident):
+            return elapsed
+
+
+def _tcp_rtt(ip: str, port: int, timeout: float) -> Optional[float]:
+    """测量一次TCP连接时间（毫秒），超时或不可达返回None"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        start = time.perf_counter()
+        code = sock.connect_ex((ip, port))
+        elapsed = (time.perf_counter() - start) * 1000
+    except OSError:
+        return None
+    finally:
+        sock.close()
+    if code == 0 or code in _TCP_ANSWERED:
+        return elapsed
+    return None
+
+
+def _summary(result: Dict, rtts: List[Optional[float]]) -> Dict:
+    """根据每次探测的往返时间计算统计值"""
+    received = [rtt for rtt in rtts if rtt is not None]
+    result['sent'] = len(rtts)
+    result['received'] = len(received)
+    result['rtts'] = [round(rtt, 2) if rtt is not None else None for rtt in rtts]
+    result['loss'] = (1 - len(received) / len(rtts)) if rtts else 1.0
+    if received:
+        result.update(
+            min_ms=min(received),
+            avg_ms=statistics.mean(received),
+            max_ms=max(received),
+            stddev_ms=statistics.pstdev(received),
+            success=True,
+        )
+    elif not result['error']:
+        result['error'] = '请求超时'
+    return result
+
+
+def measure_latency(host: str, count: int = 4, timeout: float = PROBE_TIMEOUT,
+                    interval: float = PROBE_INTERVAL, method: str = 'auto',
+                    port: int = TCP_PORT, ip: Optional[str] = None) -> Dict:
+    """
+    测量到主机的网络延迟
+
+    Args:
+        host: 域名或IP
+        count: 探测次数
+        timeout: 每次探测的超时（秒）
+        interval: 两次探测之间的间隔（秒）
+        method: 'auto'（ICMP，不可用或全部超时时改用TCP）、'icmp' 或 'tcp'
+        port: TCP探测的端口
+        ip: 已解析的IP（不再解析host）
+
+    Returns:
+        {'host', 'ip', 'method', 'sent', 'received', 'rtts', 'loss',
+         'min_ms', 'avg_ms', 'max_ms', 'stddev_ms', 'success', 'error'}
+        rtts为每次探测的往返时间（毫秒，超时为None），loss为丢包比例（0~1）
+    """
+    result = {
+        'host': host, 'ip': ip, 'method': None,
+        'sent': 0, 'received': 0, 'rtts': [], 'loss': None,
+        'min_ms': None, 'avg_ms': None, 'max_ms': None, 'stddev_ms': None,
+        'success': False, 'error': None,
+    }
+
+    if not ip:
+        try:
+            ip = socket.gethostbyname(host)
+        except (socket.gaierror, UnicodeError) as e:
+            result['error'] = f'DNS解析失败: {e}'
+            return result
+        result['ip'] = ip
+
+    count = max(1, count)
+    rtts: List[Optional[float]] = []
+
+    sock, raw = _open_icmp_socket() if method in ('auto', 'icmp') else (None, False)
+    if sock is not None:
+        result['method'] = 'icmp'
+        ident = random.randint(0, 0xFFFF)
+        try:
+            for seq in range(1, count + 1):
+                if seq > 1:
+                    time.sleep(interval)
+                rtts.append(_icmp_rtt(sock, raw, ip, ident, seq, timeout))
+        except OSError as e:
+            # 发送被系统拒绝（如防火墙）时改用TCP
+            if method == 'icmp':
+                result['error'] = f'ICMP探测失败: {e}'
+                return _summary(result, rtts or [None])
+            rtts = []
+        finally:
+            sock.close()
+        if method == 'icmp' or any(rtt is not None for rtt in rtts):
+            return _summary(result, rtts)
+        # 自动模式下ICMP全部超时：网络可能静默丢弃ICMP，改用TCP再测一轮
+        rtts = []
+    elif method == 'icmp':
+        result['error'] = '系统不允许发送ICMP'
+        return result
+
+    result['method'] = 'tcp'
+    for seq in range(count):
+        if seq:
+            time.sleep(interval)
+        rtts.append(_tcp_rtt(ip, port, timeout))
+    return _summary(result, rtts)
+
+
+def format_latency_summary(result: Dict) -> str:
+    """延迟统计的简短描述，如 '平均 23.1ms（最小 20.5 / 最大 27.0 / 抖动 2.3，ICMP）'"""
+    if not result.get('success'):
+        return f"✗ {result.get('error') or '不可达'}"
+    return (f"平均 {result['avg_ms']:.1f}ms（最小 {result['min_ms']:.1f} / 最大 {result['max_ms']:.1f}"
+            f" / 抖动 {result['stddev_ms']:.1f}，{(result.get('method') or '').upper()}）")
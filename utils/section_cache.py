@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+系统信息分部分缓存（保存在用户缓存目录）
+系统版本、浏览器版本、DNS服务器等很少变化的信息收集较慢（需要运行外部命令），
+在有效期内且相关文件未变化时直接使用上次的结果
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+from typing import Dict, List, Optional
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.app_dirs import get_app_cache_dir
+from utils.elevate_permission import atomic_write_file
+from utils.file_lock import file_lock
+
+# 各部分的缓存有效期（秒），不在其中的部分不缓存
+SECTION_TTLS = {
+    'system': 24 * 3600,
+    'browser': 24 * 3600,
+    'dns': 30 * 60,
+    'hosts': 3600,
+}
+
+
+def get_section_cache_path() -> str:
+    """缓存文件路径"""
+    return os.path.join(get_app_cache_dir(), 'system_info_cache.json')
+
+
+def _file_stamp(path: str) -> List:
+    """文件的 [路径, 修改时间, 大小]，文件不存在时后两项为None"""
+    try:
+        stat = os.stat(path)
+        return [path, stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return [path, None, None]
+
+
+def _local_ip() -> Optional[str]:
+    """本机出口IP（UDP套接字connect不发送数据），用于发现网络切换"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(('8.8.8.8', 80))
+            return s.getsockname()[0]
+    except OSError:
+        return None
+
+
+def get_fingerprint(key: str) -> List:
+    """
+    部分的失效条件：与缓存时不同则缓存失效
+
+    - system: 系统版本
+    - browser: 各浏览器可执行文件的修改时间（升级浏览器后失效）
+    - dns: resolv.conf的修改时间和本机IP（切换网络后失效）
+    - hosts: hosts文件的修改时间
+    """
+    system = platform.system()
+    if key == 'system':
+        return [platform.platform()]
+    if key == 'browser':
+        from browser.check_browser import BROWSER_EXECUTABLES
+        paths = [path for paths in BROWSER_EXECUTABLES.get(system, {}).values() for path in paths]
+        return [_file_stamp(path) for path in paths]
+    if key == 'dns':
+        stamps = [_file_stamp('/etc/resolv.conf')] if system != 'Windows' else []
+        return stamps + [_local_ip()]
+    if key == 'hosts':
+        from hosts.check_hosts import get_hosts_path
+        return [_file_stamp(get_hosts_path())]
+    return []
+
+
+def _load() -> Dict[str, Dict]:
+    try:
+        with open(get_section_cache_path(), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def load_section(key: str, fingerprint: Optional[List] = None) -> Optional[Dict]:
+    """
+    读取缓存的部分
+
+    Returns:
+        {'data', 'time'}，没有缓存、已过期或失效条件变化时返回None
+    """
+    ttl = SECTION_TTLS.get(key)
+    entry = _load().get(key)
+    if not ttl or not entry:
+        return None
+    if not 0 <= time.time() - entry.get('time', 0) < ttl:
+        return None
+    if fingerprint is None:
+        fingerprint = get_fingerprint(key)
+    # 经过JSON往返后元组变成列表，统一按JSON比较
+    if entry.get('fingerprint') != json.loads(json.dumps(fingerprint)):
+        return None
+    return {'data': entry.get('data'), 'time': entry['time']}
+
+
+def store_section(key: str, data: Dict, fingerprint: Optional[List] = None):
+    """保存部分的收集结果（出错或超时的结果不保存）"""
+    if key not in SECTION_TTLS or not isinstance(data, dict) or 'error' in data:
+        return
+    if fingerprint is None:
+        fingerprint = get_fingerprint(key)
+    path = get_section_cache_path()
+    try:
+        with file_lock(path):
+            cache = _load()
+            cache[key] = {'time': time.time(), 'fingerprint': fingerprint, 'data': data}
+            atomic_write_file(path, json.dumps(cache, ensure_ascii=False, indent=1))
+    except (OSError, TypeError, ValueError) as e:
+        print(f"警告: 保存系统信息缓存失败: {e}")
+
+
+def clear_section_cache(key: Optional[str] = None):
+    """清除缓存（key为None时清除全部）"""
+    path = get_section_cache_path()
+    with file_lock(path):
+        cache = {} if key is None else _load()
+        cache.pop(key, None)
+        atomic_write_file(path, json.dumps(cache, ensure_ascii=False, indent=1))
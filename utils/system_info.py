@@ -12,7 +12,10 @@ import socket
 import subprocess
 import re
 import json
-from typing import Dict, List, Optional, Tuple
+import time
+import queue
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 # 添加父目录到路径
@@ -27,6 +30,33 @@ except ImportError:
 # 导入现有模块
 from browser.check_browser import check_browser_version, check_all_browsers
 from hosts.check_hosts import get_hosts_path, check_hosts, QIANTU_DOMAINS
+from hosts.hosts_cache import get_cache_stats
+from hosts.source_health import get_health_report
+from utils.latency_probe import measure_latency, PROBE_TIMEOUT, PROBE_INTERVAL
+from utils.section_cache import SECTION_TTLS, get_fingerprint, load_section, store_section
+
+# 信息的各个部分: (键, 名称, 收集方法)，各部分相互独立，并发收集
+SECTIONS = [
+    ('system', '系统信息', 'get_system_info'),
+    ('browser', '浏览器信息', 'get_browser_info'),
+    ('network', '网络信息', 'get_network_info'),
+    ('dns', 'DNS信息', 'get_dns_info'),
+    ('hosts', 'Hosts信息', 'get_hosts_info'),
+    ('ping', 'Ping测试', 'ping_domains'),
+    ('sources', 'IP查询来源', 'get_source_health'),
+    ('permissions', '权限信息', 'check_permissions'),
+]
+
+# Ping测试: 同时ping的域名数量上限、单个域名的超时、全部域名的总时限（秒）
+PING_WORKERS = 4
+PING_TIMEOUT = 10
+PING_DEADLINE = 20
+
+# 每个部分的收集超时（秒），超时的部分标记为超时，不影响其他部分
+SECTION_TIMEOUT = 20
+SECTION_TIMEOUTS = {
+    'ping': PING_DEADLINE + 5,  # Ping自身有总时限，这里只是兜底
+}
 
 
 class SystemInfoCollector:
@@ -34,6 +64,8 @@ class SystemInfoCollector:
     
     def __init__(self):
         self.system = platform.system()
+        # 最近一次收集中使用了缓存的部分 {键: 缓存时间戳}
+        self.cached_sections: Dict[str, float] = {}
     
     def get_system_info(self) -> Dict:
         """获取系统信息"""
@@ -136,17 +168,17 @@ class SystemInfoCollector:
                 except:
                     pass
             
-            # 获取公网IP
+            # 获取公网IP（共享HTTP连接池）
             try:
-                import requests
-                response = requests.get('https://api.ipify.org?format=json', timeout=5)
+                from utils.http_client import http_get
+                response = http_get('https://api.ipify.org?format=json', timeout=(3, 5))
                 if response.status_code == 200:
                     info['public_ip'] = response.json().get('ip')
             except:
                 try:
                     # 备用方法
-                    import requests
-                    response = requests.get('https://ifconfig.me/ip', timeout=5)
+                    from utils.http_client import http_get
+                    response = http_get('https://ifconfig.me/ip', timeout=(3, 5))
                     if response.status_code == 200:
                         info['public_ip'] = response.text.strip()
                 except:
@@ -220,6 +252,7 @@ class SystemInfoCollector:
                 'writable': os.access(hosts_path, os.W_OK) if os.path.exists(hosts_path) else False,
                 'bindings': [],
                 'binding_count': len(bindings),
+                'cache_stats': get_cache_stats(),
             }
             
             for domain, binding_info in bindings.items():
@@ -234,78 +267,35 @@ class SystemInfoCollector:
         except Exception as e:
             return {'error': str(e), 'path': get_hosts_path()}
     
-    def ping_domain(self, domain: str, count: int = 4) -> Dict:
-        """Ping域名测试"""
+    def ping_domain(self, domain: str, count: int = 4, timeout: float = PING_TIMEOUT) -> Dict:
+        """
+        Ping域名测试（进程内ICMP探测，系统不允许或全部超时时测量TCP连接时间）
+        
+        Args:
+            domain: 域名
+            count: 探测次数
+            timeout: 整个测试的超时（秒）
+        """
         try:
+            # ICMP全部超时时还会再测一轮TCP，每次探测的超时按两轮分配
+            probe_timeout = max(0.2, min(PROBE_TIMEOUT, timeout / (2 * count) - PROBE_INTERVAL))
+            probe = measure_latency(domain, count=count, timeout=probe_timeout)
             result = {
                 'domain': domain,
-                'ip': None,
-                'latency': None,
-                'loss': None,
-                'success': False,
-                'error': None,
+                'ip': probe['ip'],
+                'latency': f"{probe['avg_ms']:.1f}ms" if probe['success'] else None,
+                'loss': f"{probe['loss']:.0%}" if probe['loss'] is not None else None,
+                'success': probe['success'],
+                'error': probe['error'],
+                'method': probe['method'],
+                'rtts': probe['rtts'],
+                'min_ms': probe['min_ms'],
+                'avg_ms': probe['avg_ms'],
+                'max_ms': probe['max_ms'],
+                'stddev_ms': probe['stddev_ms'],
             }
-            
-            # 先解析域名获取IP
-            try:
-                ip = socket.gethostbyname(domain)
-                result['ip'] = ip
-            except socket.gaierror as e:
-                result['error'] = f'DNS解析失败: {str(e)}'
-                return result
-            
-            # 执行ping
-            if self.system == 'Windows':
-                cmd = ['ping', '-n', str(count), domain]
-            else:
-                cmd = ['ping', '-c', str(count), domain]
-            
-            try:
-                ping_result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-                
-                if ping_result.returncode == 0:
-                    # 解析ping结果
-                    output = ping_result.stdout
-                    
-                    # 提取延迟信息
-                    if self.system == 'Windows':
-                        # Windows格式: 平均 = 12ms
-                        match = re.search(r'平均\s*=\s*(\d+)ms', output)
-                        if not match:
-                            match = re.search(r'Average\s*=\s*(\d+)ms', output)
-                        if match:
-                            result['latency'] = f"{match.group(1)}ms"
-                    else:
-                        # Unix格式: min/avg/max/mdev = 10.123/12.456/15.789/2.123 ms
-                        match = re.search(r'min/avg/max/[^=]*=\s*([\d.]+)/([\d.]+)/([\d.]+)', output)
-                        if match:
-                            result['latency'] = f"{match.group(2)}ms"
-                    
-                    # 提取丢包率
-                    if self.system == 'Windows':
-                        match = re.search(r'\((\d+)%', output)
-                        if match:
-                            loss = int(match.group(1))
-                            result['loss'] = f"{loss}%"
-                        else:
-                            result['loss'] = "0%"
-                    else:
-                        match = re.search(r'(\d+)% packet loss', output)
-                        if match:
-                            result['loss'] = f"{match.group(1)}%"
-                        else:
-                            result['loss'] = "0%"
-                    
-                    result['success'] = True
-                else:
-                    result['error'] = 'Ping失败'
-                    result['loss'] = "100%"
-                    
-            except subprocess.TimeoutExpired:
+            if probe['error'] == '请求超时':
                 result['error'] = 'Ping超时'
-            except Exception as e:
-                result['error'] = str(e)
-            
             return result
         except Exception as e:
             return {
@@ -314,8 +304,21 @@ class SystemInfoCollector:
                 'success': False,
             }
     
-    def ping_domains(self, domains: Optional[List[str]] = None) -> Dict:
-        """Ping多个域名"""
+    def ping_domains(self, domains: Optional[List[str]] = None,
+                     max_workers: int = PING_WORKERS, deadline: float = PING_DEADLINE,
+                     on_result: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+        """
+        并发Ping多个域名
+        
+        Args:
+            domains: 域名列表，默认为千图相关域名
+            max_workers: 同时ping的域名数量上限
+            deadline: 全部域名的总时限（秒），到时仍未完成的域名记为超时
+            on_result: 每个域名完成时的回调 on_result(域名, 结果)，在调用线程中执行
+            
+        Returns:
+            {域名: 结果}，按domains的顺序
+        """
         if domains is None:
             domains = [
                 'preview.qiantucdn.com',
@@ -328,11 +331,52 @@ class SystemInfoCollector:
                 'proxy-vd.58pic.com',
             ]
         
-        results = {}
+        domains = list(dict.fromkeys(domains))
+        if not domains:
+            return {}
+        
+        end = time.monotonic() + deadline
+        pending: queue.Queue = queue.Queue()
+        done: queue.Queue = queue.Queue()
         for domain in domains:
-            results[domain] = self.ping_domain(domain)
+            pending.put(domain)
+        
+        def worker():
+            while True:
+                try:
+                    domain = pending.get_nowait()
+                except queue.Empty:
+                    return
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    return
+                # 单个域名的超时不超过剩余时间，ping进程不会拖过总时限
+                done.put((domain, self.ping_domain(domain, timeout=min(PING_TIMEOUT, remaining))))
+        
+        # 守护线程：超过总时限的ping被放弃，不阻塞程序退出
+        for _ in range(max(1, min(max_workers, len(domains)))):
+            threading.Thread(target=worker, daemon=True).start()
+        
+        results = {}
+        while len(results) < len(domains):
+            wait = end - time.monotonic()
+            if wait <= 0:
+                break
+            try:
+                domain, result = done.get(timeout=wait)
+            except queue.Empty:
+                break
+            results[domain] = result
+            if on_result:
+                on_result(domain, result)
         
-        return results
+        for domain in domains:
+            if domain not in results:
+                results[domain] = {'domain': domain, 'success': False,
+                                   'error': f'Ping超时（未在{deadline:g}秒内完成）'}
+                if on_result:
+                    on_result(domain, results[domain])
+        return {domain: results[domain] for domain in domains}
     
     def check_permissions(self) -> Dict:
         """检查权限状态"""
@@ -361,18 +405,126 @@ class SystemInfoCollector:
         except Exception as e:
             return {'error': str(e)}
     
-    def collect_all(self) -> Dict:
-        """收集所有信息"""
-        return {
-            'timestamp': datetime.now().isoformat(),
-            'system': self.get_system_info(),
-            'browser': self.get_browser_info(),
-            'network': self.get_network_info(),
-            'dns': self.get_dns_info(),
-            'hosts': self.get_hosts_info(),
-            'ping': self.ping_domains(),
-            'permissions': self.check_permissions(),
-        }
+    def get_source_health(self) -> Dict:
+        """获取IP查询来源的健康度"""
+        try:
+            return get_health_report()
+        except Exception as e:
+            return {'error': str(e)}
+    
+    def _cached_getter(self, key: str, getter: Callable[[], Dict],
+                       force_refresh: bool) -> Callable[[], Dict]:
+        """包装收集方法：缓存有效时直接返回缓存结果，否则重新收集并保存"""
+        def run() -> Dict:
+            fingerprint = get_fingerprint(key)
+            if not force_refresh:
+                cached = load_section(key, fingerprint)
+                if cached is not None:
+                    self.cached_sections[key] = cached['time']
+                    data = cached['data']
+                    if key == 'hosts':
+                        data['cache_stats'] = get_cache_stats()  # 运行时统计不使用缓存
+                    return data
+            data = getter()
+            store_section(key, data, fingerprint)
+            return data
+        return run
+    
+    def iter_sections(self, sections: Optional[List[str]] = None,
+                      on_ping: Optional[Callable[[str, Dict], None]] = None,
+                      force_refresh: bool = False) -> Iterator[Tuple[str, Dict]]:
+        """
+        并发收集各部分信息，按完成先后逐个产出
+        
+        很少变化的部分（SECTION_TTLS）在缓存有效时直接使用缓存结果。
+        
+        Args:
+            sections: 要收集的部分（SECTIONS中的键），默认全部
+            on_ping: 每个域名Ping完成时的回调 on_ping(域名, 结果)，在Ping的收集线程中执行
+            force_refresh: 忽略缓存，全部重新收集
+            
+        Yields:
+            (键, 结果)；超时的部分结果为 {'error': ..., 'timeout': True}
+        """
+        keys = list(sections) if sections else [key for key, _, _ in SECTIONS]
+        getters = {key: getattr(self, method) for key, _, method in SECTIONS}
+        if on_ping:
+            getters['ping'] = lambda: self.ping_domains(on_result=on_ping)
+        for key in SECTION_TTLS:
+            if key in getters:
+                getters[key] = self._cached_getter(key, getters[key], force_refresh)
+        self.cached_sections = {}
+        done: queue.Queue = queue.Queue()
+        
+        def run(key: str):
+            try:
+                result = getters[key]()
+            except Exception as e:
+                result = {'error': str(e)}
+            done.put((key, result))
+        
+        # 守护线程：超时的部分被放弃，不阻塞程序退出
+        for key in keys:
+            threading.Thread(target=run, args=(key,), daemon=True).start()
+        
+        start = time.monotonic()
+        deadlines = {key: start + SECTION_TIMEOUTS.get(key, SECTION_TIMEOUT) for key in keys}
+        
+        while deadlines:
+            wait = min(deadlines.values()) - time.monotonic()
+            if wait > 0:
+                try:
+                    key, result = done.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                if key in deadlines:  # 已超时的部分晚到的结果丢弃
+                    del deadlines[key]
+                    yield key, result
+                continue
+            now = time.monotonic()
+            for key in [k for k, deadline in deadlines.items() if deadline <= now]:
+                del deadlines[key]
+                timeout = SECTION_TIMEOUTS.get(key, SECTION_TIMEOUT)
+                yield key, {'error': f'收集超时（{timeout}秒）', 'timeout': True}
+    
+    def collect_sections(self, sections: Optional[List[str]] = None,
+                         on_section: Optional[Callable[[str, Dict], None]] = None,
+                         on_ping: Optional[Callable[[str, Dict], None]] = None,
+                         force_refresh: bool = False) -> Dict:
+        """
+        并发收集各部分信息，总耗时取决于最慢的部分
+        
+        Args:
+            sections: 要收集的部分（SECTIONS中的键），默认全部
+            on_section: 每个部分完成（或超时）时的回调 on_section(键, 结果)，在调用线程中执行
+            on_ping: 每个域名Ping完成时的回调 on_ping(域名, 结果)，在Ping的收集线程中执行
+            force_refresh: 忽略缓存，全部重新收集
+            
+        Returns:
+            {键: 结果}，按SECTIONS的顺序；超时的部分为 {'error': ..., 'timeout': True}
+        """
+        keys = list(sections) if sections else [key for key, _, _ in SECTIONS]
+        results = {}
+        for key, result in self.iter_sections(keys, on_ping=on_ping, force_refresh=force_refresh):
+            results[key] = result
+            if on_section:
+                on_section(key, result)
+        return {key: results[key] for key in keys}
+    
+    def collect_all(self, on_section: Optional[Callable[[str, Dict], None]] = None,
+                    on_ping: Optional[Callable[[str, Dict], None]] = None,
+                    force_refresh: bool = False) -> Dict:
+        """收集所有信息（各部分并发收集，force_refresh为True时不使用缓存）"""
+        data = {'timestamp': datetime.now().isoformat()}
+        data.update(self.collect_sections(on_section=on_section, on_ping=on_ping,
+                                          force_refresh=force_refresh))
+        data['cached'] = self.cached_info()
+        return data
+    
+    def cached_info(self) -> Dict[str, str]:
+        """最近一次收集中使用了缓存的部分 {键: 缓存时间}"""
+        return {key: datetime.fromtimestamp(cached_at).isoformat(timespec='seconds')
+                for key, cached_at in self.cached_sections.items()}
     
     def format_text_report(self, data: Optional[Dict] = None) -> str:
         """格式化文本报告"""
@@ -384,6 +536,11 @@ class SystemInfoCollector:
         lines.append("千图网问题解决工具 - 系统信息报告")
         lines.append("=" * 60)
         lines.append(f"生成时间: {data.get('timestamp', 'N/A')}")
+        cached = data.get('cached') or {}
+        if cached:
+            labels = {key: label for key, label, _ in SECTIONS}
+            lines.append("使用缓存: " + ", ".join(
+                f"{labels.get(key, key)}（{cached_at}）" for key, cached_at in cached.items()))
         lines.append("")
         
         # 系统信息
@@ -398,7 +555,11 @@ class SystemInfoCollector:
         # 浏览器信息
         lines.append("【浏览器信息】")
         browser_info = data.get('browser', {})
+        if 'error' in browser_info:
+            lines.append(f"  ✗ 获取失败 ({browser_info['error']})")
         for browser_name, info in browser_info.items():
+            if not isinstance(info, dict):
+                continue
             if info.get('installed'):
                 lines.append(f"  {browser_name}:")
                 lines.append(f"    版本: {info.get('version', 'N/A')}")
@@ -433,6 +594,9 @@ class SystemInfoCollector:
         lines.append(f"  可读: {'✓' if hosts_info.get('readable') else '✗'}")
         lines.append(f"  可写: {'✓' if hosts_info.get('writable') else '✗'}")
         lines.append(f"  已绑定域名数: {hosts_info.get('binding_count', 0)}")
+        cache_stats = hosts_info.get('cache_stats')
+        if cache_stats:
+            lines.append(f"  解析缓存: 命中 {cache_stats.get('hits', 0)} 次, 未命中 {cache_stats.get('misses', 0)} 次")
         if hosts_info.get('bindings'):
             lines.append("  绑定列表:")
             for binding in hosts_info['bindings']:
@@ -442,16 +606,44 @@ class SystemInfoCollector:
         # Ping测试
         lines.append("【Ping测试】")
         ping_info = data.get('ping', {})
+        if 'error' in ping_info:
+            lines.append(f"  ✗ 获取失败 ({ping_info['error']})")
         for domain, result in ping_info.items():
+            if not isinstance(result, dict):
+                continue
             if result.get('success'):
                 lines.append(f"  {domain}:")
                 lines.append(f"    IP: {result.get('ip', 'N/A')}")
                 lines.append(f"    延迟: {result.get('latency', 'N/A')}")
                 lines.append(f"    丢包率: {result.get('loss', 'N/A')}")
+                if result.get('avg_ms') is not None:
+                    lines.append(f"    往返时间: 最小 {result['min_ms']:.1f}ms / 最大 {result['max_ms']:.1f}ms"
+                                 f" / 抖动 {result['stddev_ms']:.1f}ms（{(result.get('method') or '').upper()}）")
             else:
                 lines.append(f"  {domain}: ✗ 失败 ({result.get('error', 'N/A')})")
         lines.append("")
         
+        # IP查询来源健康度
+        lines.append("【IP查询来源】")
+        source_info = data.get('sources', {})
+        state_names = {'closed': '正常', 'open': '熔断中', 'half_open': '待试探'}
+        if not source_info:
+            lines.append("  暂无记录")
+        elif 'error' in source_info:
+            lines.append(f"  ✗ 获取失败 ({source_info['error']})")
+        for name, health in source_info.items():
+            if not isinstance(health, dict):
+                continue
+            rate = health.get('success_rate')
+            latency = health.get('avg_latency_ms')
+            lines.append(
+                f"  {name}: 成功率 {f'{rate:.0%}' if rate is not None else 'N/A'}"
+                f", 平均耗时 {f'{latency:.0f}ms' if latency is not None else 'N/A'}"
+                f", 最近 {health.get('samples', 0)} 次"
+                f", 状态 {state_names.get(health.get('state'), health.get('state'))}"
+            )
+        lines.append("")
+        
         # 权限信息
         lines.append("【权限信息】")
         perm_info = data.get('permissions', {})